@@ -0,0 +1,34 @@
+import re
+
+_MARKER = re.compile(r'\[(\d+)\]')
+
+
+def cited_numbers(data: dict) -> list[int]:
+    """Snippet numbers from "cited", or from the [n] markers in the answer if the model left it out."""
+    nums = data.get("cited")
+    if not isinstance(nums, list):
+        nums = _MARKER.findall(str(data.get("answer", "")))
+    out = []
+    for n in nums:
+        try:
+            n = int(str(n).strip("[] "))
+        except ValueError:
+            continue
+        if n not in out:
+            out.append(n)
+    return out
+
+
+def hydrate_citations(data, snippets: list[dict]):
+    """
+    Build AnswerJSON citations from the packed snippets the answer cites,
+    in the order first cited. Numbers with no matching snippet are dropped.
+    An answer that already carries citations (copy mode) is left alone.
+    """
+    if not isinstance(data, dict) or ("citations" in data and "cited" not in data):
+        return data
+    by_n = {s["n"]: s for s in snippets}
+    data["citations"] = [{"source": by_n[n]["source"], "page": by_n[n]["page"], "snippet": by_n[n]["snippet"]}
+                         for n in cited_numbers(data) if n in by_n]
+    data.pop("cited", None)
+    return data
@@ -1,4 +1,10 @@
-from clients.openai_client import chat_json
+from clients.openai_client import chat_json, achat_json, achat_json_stream
 
 def get_json_answer(messages: list[dict]) -> str:
     return chat_json(messages, max_tokens=900)
+
+async def aget_json_answer(messages: list[dict]) -> str:
+    return await achat_json(messages, max_tokens=900)
+
+def astream_json_answer(messages: list[dict]):
+    return achat_json_stream(messages, max_tokens=900)
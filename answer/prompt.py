@@ -10,6 +10,17 @@ Ensure 'page' is always an integer. If the snippet has no page, use page 0.
 Do not include any text outside JSON.
 """
 
+# Citation text is attached server-side from the snippets (answer.cite), so
+# the model only names the numbers and spends no output tokens copying them.
+SYS_IDS = """You are a legal assistant for Indian law.
+Answer only using the numbered snippets provided below.
+If missing info, reply exactly: "Insufficient information in provided sources."
+Return ONLY valid JSON with keys: query, answer, cited.
+In "answer", write in the user's language and include inline markers [1][2] that refer to the snippet numbers.
+"cited" is an array of the snippet numbers the answer relies on, e.g. [1, 3]. Do not copy snippet text.
+Do not include any text outside JSON.
+"""
+
 USR_TMPL = Template("""Question:
 {{ q }}
 
@@ -21,8 +32,8 @@ Snippets:
 Return JSON only.
 """)
 
-def build_messages(q, snippets):
+def build_messages(q, snippets, cite_mode="copy"):
     return [
-        {"role": "system", "content": SYS},
+        {"role": "system", "content": SYS_IDS if cite_mode == "ids" else SYS},
         {"role": "user", "content": USR_TMPL.render(q=q, snippets=snippets)}
     ]
\ No newline at end of file
@@ -0,0 +1,61 @@
+import json, re
+
+_ANSWER_KEY = re.compile(r'"answer"\s*:\s*"')
+_ESCAPE_LEN = {"u": 6}
+_HIGH_SURROGATE = re.compile(r"\\u[dD][89abAB]")
+
+
+class AnswerTextStream:
+    """
+    Pulls the "answer" string out of a JSON completion while it is still
+    being generated, so the text can be shown before the JSON is complete.
+    feed() takes raw deltas and returns the newly decoded answer text.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.pos = None      # index in raw of the next undecoded answer char
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        self.raw += delta
+        if self.done:
+            return ""
+        if self.pos is None:
+            m = _ANSWER_KEY.search(self.raw)
+            if not m:
+                return ""
+            self.pos = m.end()
+
+        out, i, raw = [], self.pos, self.raw
+        while i < len(raw):
+            ch = raw[i]
+            if ch == '"':
+                self.done = True
+                break
+            if ch == "\\":
+                if i + 1 >= len(raw):
+                    break
+                n = _ESCAPE_LEN.get(raw[i + 1], 2)
+                if i + n > len(raw):
+                    break  # escape split across deltas; wait for the rest
+                if _HIGH_SURROGATE.match(raw, i):
+                    # Characters outside the BMP arrive as two \u escapes; decode them together
+                    low = raw[i + 6:i + 8]
+                    if len(raw) < i + 12 and low == "\\u"[:len(low)]:
+                        break
+                    if low == "\\u":
+                        n = 12
+                try:
+                    out.append(json.loads(f'"{raw[i:i + n]}"'))
+                except ValueError:
+                    out.append(raw[i + 1:i + n])
+                i += n
+                continue
+            j = i
+            while j < len(raw) and raw[j] not in '"\\':
+                j += 1
+            out.append(raw[i:j])
+            i = j
+        self.pos = i
+        return "".join(out)
@@ -1,15 +1,254 @@
-import json
-from clients.openai_client import chat_json
+import json, re, threading
+from collections import Counter
+from core.schemas import AnswerJSON
+from clients.openai_client import chat_json, achat_json
+from answer.cite import hydrate_citations
 
 REPAIR_SYS = "You output JSON only. Do not include any extra text."
 REPAIR_USER = "Repair the following into valid JSON only, keeping the same keys and content:\n\n{}"
 
-def parse_or_repair(raw: str):
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+_PAGE_NUM = re.compile(r'\d+')
+_DECODER = json.JSONDecoder(strict=False)
+
+
+class RepairStats:
+    """How answers got parsed: clean, fixed locally (and why), fixed by the LLM, or not at all."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes = Counter()
+        self.causes = Counter()
+
+    def record(self, outcome: str, causes=()):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.causes.update(causes)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self.outcomes.values())
+            repaired = total - self.outcomes["clean"]
+            return {
+                "total": total,
+                "outcomes": dict(self.outcomes),
+                "causes": dict(self.causes),
+                "repair_rate": round(repaired / total, 4) if total else 0.0,
+                "llm_rate": round(self.outcomes["llm"] / total, 4) if total else 0.0,
+            }
+
+
+repair_stats = RepairStats()
+
+
+# Every key AnswerJSON (or the "ids" cite mode) can contain
+SCHEMA_KEYS = frozenset({"query", "answer", "cited", "citations", "source", "page", "snippet"})
+_NEXT_KEY = re.compile(r'"([^"\\]*)(")?\s*(:)?')
+
+
+def _close_quote_ahead(s: str, i: int, in_array: bool) -> bool:
+    """
+    True if the quote at s[i] can end a value string: what follows is } ] or
+    the end, or a comma leading into the next element of an array or into a
+    schema key. `terms "a", "b" here` inside an answer is not a close.
+    """
+    ws = " \t\r\n"
+    j = i + 1
+    while j < len(s) and s[j] in ws:
+        j += 1
+    if j == len(s) or s[j] in "}]":
+        return True
+    if s[j] != ",":
+        return False
+    j += 1
+    while j < len(s) and s[j] in ws:
+        j += 1
+    if j == len(s):
+        return True
+    if s[j] in "{[":
+        return in_array
+    if s[j] != '"':
+        return False
+    if in_array:
+        return True
+    m = _NEXT_KEY.match(s, j)
+    if m.group(3):
+        return m.group(1) in SCHEMA_KEYS
+    # Output cut off inside or right after the next key
+    return m.end() == len(s) and any(k.startswith(m.group(1)) for k in SCHEMA_KEYS)
+
+
+def _scan(s: str, causes: list) -> str:
+    """
+    One pass over the text tracking strings and open containers. Escapes
+    quotes inside values that cannot end the string, then closes whatever a
+    truncated completion left open: a cut-off value string is closed, a
+    cut-off key (or key with no value) is dropped with its comma.
+    """
+    out, stack, i = [], [], 0     # frames: [closer, "key"|"value", index in out where the pair began]
+    in_str = is_key = key_done = False
+    while i < len(s):
+        ch = s[i]
+        if in_str:
+            if ch == "\\" and i + 1 < len(s):
+                out.append(s[i:i + 2])
+                i += 2
+                continue
+            if ch == '"':
+                if is_key or _close_quote_ahead(s, i, bool(stack) and stack[-1][0] == "]"):
+                    in_str, key_done = False, is_key
+                else:
+                    ch = '\\"'
+                    causes.append("unescaped_quote")
+            out.append(ch)
+            i += 1
+            continue
+        top = stack[-1] if stack else None
+        if ch == '"':
+            in_str, is_key = True, bool(top) and top[0] == "}" and top[1] == "key"
+        elif ch == "{":
+            stack.append(["}", "key", len(out) + 1])
+        elif ch == "[":
+            stack.append(["]", "value", None])
+        elif ch in "}]" and stack:
+            stack.pop()
+        elif ch == "," and top and top[0] == "}":
+            top[1], top[2] = "key", len(out)
+        elif ch == ":" and top and top[0] == "}":
+            top[1], key_done = "value", False
+        out.append(ch)
+        i += 1
+
+    if not in_str and not stack:
+        return "".join(out)
+    causes.append("truncated")
+    top = stack[-1] if stack else None
+    dangling = top and top[0] == "}" and (
+        (in_str and is_key) or key_done or (top[1] == "value" and "".join(out).rstrip().endswith(":")))
+    if dangling:
+        out = out[:top[2]]
+    elif in_str:
+        if out and out[-1] == "\\":
+            out.pop()
+        out.append('"')
+    text = "".join(out).rstrip().rstrip(",")
+    return text + "".join(reversed([f[0] for f in stack]))
+
+
+def _coerce(data, causes: list):
+    """Fix the field types AnswerJSON is strict about without guessing at content."""
+    if not isinstance(data, dict):
+        return data
+    cits = data.get("citations")
+    if cits is None:
+        data["citations"] = []
+        causes.append("missing_citations")
+    elif isinstance(cits, list):
+        kept = []
+        for c in cits:
+            if not (isinstance(c, dict) and c.get("source") and "snippet" in c):
+                causes.append("incomplete_citation")
+                continue
+            page = c.get("page", 1)
+            if not isinstance(page, int) or isinstance(page, bool):
+                m = _PAGE_NUM.search(str(page)) if page is not None else None
+                c["page"] = int(m.group()) if m else 1
+                causes.append("page_type")
+            kept.append(c)
+        data["citations"] = kept
+    return data
+
+
+def _unique(causes: list) -> list:
+    return list(dict.fromkeys(causes))
+
+
+def repair_locally(raw: str, snippets: list[dict] | None = None) -> tuple[dict | None, list[str]]:
+    """
+    Try to turn `raw` into a valid AnswerJSON dict with no network call.
+    With `snippets`, cited snippet numbers are hydrated into citations first.
+    Returns (data or None, causes).
+    """
+    causes = []
+    text = raw.strip()
+    start = text.find("{")
+    if start == -1:
+        return None, ["unparseable"]
+    if start > 0:
+        causes.append("extra_text")
+        text = text[start:]
+    data = None
+    for attempt in ("as_is", "trailing_comma", "scan"):
+        if attempt == "trailing_comma":
+            fixed = _TRAILING_COMMA.sub(r"\1", text)
+            if fixed == text:
+                continue
+            causes.append("trailing_comma")
+            text = fixed
+        elif attempt == "scan":
+            text = _TRAILING_COMMA.sub(r"\1", _scan(text, causes))
+        try:
+            data, end = _DECODER.raw_decode(text)
+        except json.JSONDecodeError:
+            continue
+        if text[end:].strip():
+            causes.append("extra_text")
+        break
+    if data is None:
+        return None, _unique(causes + ["unparseable"])
+    if snippets is not None:
+        data = hydrate_citations(data, snippets)
+    data = _coerce(data, causes)
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        repaired = chat_json([
-            {"role": "system", "content": REPAIR_SYS},
-            {"role": "user", "content": REPAIR_USER.format(raw)}
-        ], max_tokens=900)
+        AnswerJSON(**data)
+    except Exception:
+        return None, _unique(causes + ["schema"])
+    return data, _unique(causes)
+
+
+def _parse(raw: str, snippets):
+    """The local part of parse_or_repair; returns (data, causes) or (None, causes) if the LLM must help."""
+    try:
+        data = json.loads(raw)
+        if snippets is not None:
+            data = hydrate_citations(data, snippets)
+        AnswerJSON(**data)
+        return data, []
+    except Exception:
+        pass
+    data, causes = repair_locally(raw, snippets)
+    return data, causes or ["schema"]
+
+
+def _repair_messages(raw: str):
+    return [
+        {"role": "system", "content": REPAIR_SYS},
+        {"role": "user", "content": REPAIR_USER.format(raw)}
+    ]
+
+
+def _finish_llm(repaired: str, causes: list, snippets):
+    data, more = repair_locally(repaired, snippets)
+    if data is None:
+        repair_stats.record("failed", causes + more)
         return json.loads(repaired)
+    repair_stats.record("llm", causes)
+    return data
+
+
+def parse_or_repair(raw: str, snippets: list[dict] | None = None):
+    data, causes = _parse(raw, snippets)
+    if data is not None:
+        repair_stats.record("local" if causes else "clean", causes)
+        return data
+    repaired = chat_json(_repair_messages(raw), max_tokens=900)
+    return _finish_llm(repaired, causes, snippets)
+
+
+async def aparse_or_repair(raw: str, snippets: list[dict] | None = None):
+    data, causes = _parse(raw, snippets)
+    if data is not None:
+        repair_stats.record("local" if causes else "clean", causes)
+        return data
+    repaired = await achat_json(_repair_messages(raw), max_tokens=900)
+    return _finish_llm(repaired, causes, snippets)
@@ -1,117 +1,466 @@
-from fastapi import FastAPI, UploadFile, File, Query
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, UploadFile, File, Query, Request
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 from pathlib import Path
-import hashlib
-import traceback
-import uuid
+import asyncio, hashlib, json, time
 
-from core.logging import new_req_id
-from clients.qdrant_client import qdrant, ensure_collection
-from clients.openai_client import embed_texts
+from core.trace import RequestTracing, span
+from core.metrics import Collected, TOKENS, render as render_metrics
+from clients.qdrant_client import qdrant, ensure_collection, COLLECTION
+from clients.openai_client import aembed_texts
+from clients.embed_cache import normalize
+from core.cache import TTLCache
 from core.schemas import AnswerJSON
-from ingest.extract import extract_text_pdf_bytes, extract_text_docx_bytes, extract_text_txt_bytes
-from ingest.chunk import chunk_page
-from ingest.index import index_chunks
+from ingest.pipeline import run_ingest
+from ingest.jobs import job_store
+from ingest.manifest import manifest
 from retrieve.decision import decision_agent, rewrite_query
-from retrieve.search import search
-from retrieve.pack import build_snippets
+from retrieve.search import asearch, asearch_batch, afetch, fuse_rrf
+from retrieve.lexical import lexical
+from retrieve.sections import section_index
+from retrieve.mmr import select_mmr
+from retrieve.pack import pack_context
+from core.tokens import count_tokens
 from answer.prompt import build_messages
-from answer.llm import get_json_answer
-from answer.validate import parse_or_repair
+from answer.llm import aget_json_answer, astream_json_answer
+from answer.stream import AnswerTextStream
+from answer.validate import aparse_or_repair, repair_stats
 from report.render import render_html
-from core.config import TOP_K
+from core.config import (TOP_K, QUERY_TIMEOUT, LEXICAL, QUERY_CACHE, VECTOR_CACHE_MAX, VECTOR_CACHE_TTL,
+                         ANSWER_CACHE_MAX, ANSWER_CACHE_TTL, QUERY_BATCH_MAX, QUERY_BATCH_CONCURRENCY,
+                         MMR, MMR_LAMBDA, MMR_SIM_THRESHOLD, MMR_MAX_PER_DOC, MMR_MAX_PER_PAGE, CITE_MODE)
 
 app = FastAPI(title="Legal MVP")
+app.add_middleware(RequestTracing)
 
 # Unique build id — proves reload when code changes
 with open(__file__, "rb") as f:
     BUILD_ID = hashlib.sha1(f.read()).hexdigest()[:8]
 
+# Level 1: rewritten query -> vector. Level 2: (query, filter, collection,
+# generation) -> validated answer; an ingest bumps the generation.
+vector_cache = TTLCache(VECTOR_CACHE_MAX, VECTOR_CACHE_TTL)
+answer_cache = TTLCache(ANSWER_CACHE_MAX, ANSWER_CACHE_TTL)
+
+def _answer_key(q: str, payload_filter) -> tuple:
+    return (normalize(q).casefold(), json.dumps(payload_filter, sort_keys=True),
+            COLLECTION, manifest().generation())
+
 @app.on_event("startup")
 def startup():
     ensure_collection(qdrant())
+    job_store().resume()
 
 @app.get("/healthz")
 def healthz():
     return {"ok": True, "build": BUILD_ID}
 
 @app.post("/ingest")
-async def ingest_files(files: List[UploadFile] = File(...)):
-    all_chunks, errors = [], []
-
-    for f in files:
-        name = Path(f.filename).name
-        try:
-            data = await f.read()
-            ext = name.lower().split(".")[-1]
-
-            if ext == "pdf":
-                pages = extract_text_pdf_bytes(data)
-            elif ext == "docx":
-                pages = extract_text_docx_bytes(data)
-            elif ext == "txt":
-                pages = extract_text_txt_bytes(data)
-            else:
-                raise ValueError(f"Unsupported file type: {ext}")
-
-            for (page, text) in pages:
-                # Assign safe UUIDs for point IDs
-                chunk = chunk_page(name, page, text)
-                for c in chunk:
-                    c["chunk_id"] = str(uuid.uuid4())
-                all_chunks.extend(chunk)
-
-        except Exception:
-            errors.append({"file": name, "traceback": traceback.format_exc()})
-
-    if all_chunks:
-        try:
-            index_chunks(all_chunks)
-        except Exception:
-            errors.append({"stage": "qdrant_upsert", "traceback": traceback.format_exc()})
-
-    return JSONResponse({
-        "files_received": len(files),
-        "chunks_indexed": len(all_chunks),
-        "errors": errors
-    }, status_code=200 if all_chunks or errors else 400)
+async def ingest_files(files: List[UploadFile] = File(...), wait: bool = Query(default=False)):
+    if wait:
+        # Files are read one at a time inside the pipeline, not up front
+        sources = [(Path(f.filename).name, f.file.read) for f in files]
+        result = await run_in_threadpool(run_ingest, sources)
+        # An unchanged re-upload indexes nothing yet is done; fail only if no file got that far
+        ok = any(f["status"] == "done" for f in result["files"])
+        return JSONResponse(result, status_code=200 if ok else 400)
+
+    uploads = [(Path(f.filename).name, f.file) for f in files]
+    job_id = await run_in_threadpool(job_store().submit, uploads)
+    return JSONResponse({"job_id": job_id, "status": "queued",
+                         "status_url": f"/ingest/{job_id}"}, status_code=202)
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    job = job_store().get(job_id)
+    if job is None:
+        return JSONResponse({"error": "unknown job"}, status_code=404)
+    return job
+
+async def _vectors(texts: list[str]) -> tuple[list, int]:
+    """Query vectors through the level-1 cache; all misses go out in one embeddings call."""
+    keys = [normalize(t) for t in texts]
+    vecs = [vector_cache.get(k) if QUERY_CACHE else None for k in keys]
+    hits = sum(v is not None for v in vecs)
+    miss = {keys[i]: texts[i] for i, v in enumerate(vecs) if v is None}
+    if miss:
+        with span("query", "embed", len(miss)):
+            fresh = dict(zip(miss, await aembed_texts(list(miss.values()))))
+        for k, v in fresh.items():
+            if QUERY_CACHE:
+                vector_cache.put(k, v)
+        vecs = [v if v is not None else fresh[k] for k, v in zip(keys, vecs)]
+    return vecs, hits
+
+async def _dense(q2: str, payload_filter, cache: dict):
+    vecs, hits = await _vectors([q2])
+    cache["vector"] = "hit" if hits else "miss"
+    with span("query", "search"):
+        return await asearch(vecs[0], top_k=3 * TOP_K, payload_filter=payload_filter, with_vectors=MMR)
+
+async def _with_vectors(rankings: list[list]) -> list[list]:
+    """MMR needs a vector per candidate; BM25-only hits get theirs in one fetch by ID."""
+    missing = list({str(p.id) for r in rankings for p in r if getattr(p, "vector", None) is None})
+    if not MMR or not missing:
+        return rankings
+    with span("query", "fetch"):
+        got = {str(p.id): p for p in await afetch(missing, with_vectors=True)}
+    return [[got.get(str(p.id), p) for p in r] for r in rankings]
+
+async def _lexical(q2: str, payload_filter):
+    with span("query", "lexical"):
+        return await asyncio.to_thread(lexical().search, q2, 3 * TOP_K, payload_filter)
+
+async def _retrieve(q2: str, payload_filter, cache: dict):
+    """Dense and BM25 retrieval side by side, merged with reciprocal rank fusion."""
+    if not LEXICAL:
+        return await _dense(q2, payload_filter, cache)
+    dense, lex = await asyncio.gather(
+        _dense(q2, payload_filter, cache),
+        _lexical(q2, payload_filter),
+    )
+    return (await _with_vectors([fuse_rrf([dense, lex], top_k=3 * TOP_K)]))[0]
+
+async def _retrieve_batch(q2s: list[str], filters: list):
+    """_retrieve for many queries: one embeddings call, one Qdrant batch search."""
+    vecs, _ = await _vectors(q2s)
+
+    async def searches():
+        with span("query", "search", len(vecs)):
+            return await asearch_batch(vecs, top_k=3 * TOP_K, payload_filters=filters, with_vectors=MMR)
+
+    if not LEXICAL:
+        return await searches()
+
+    async def lexical_all():
+        with span("query", "lexical", len(q2s)):
+            return await asyncio.to_thread(
+                lambda: [lexical().search(q2, 3 * TOP_K, f) for q2, f in zip(q2s, filters)])
+
+    dense, lex = await asyncio.gather(searches(), lexical_all())
+    return await _with_vectors([fuse_rrf([a, b], top_k=3 * TOP_K) for a, b in zip(dense, lex)])
+
+async def _direct(d: dict):
+    """Chunks of the provision the query names, fetched by ID from the section index."""
+    if not d.get("section"):
+        return []
+    ids = []
+    for row in section_index().lookup(d["section"], d["code"]):
+        ids += [i for i in row["chunk_ids"] if i not in ids]
+    with span("query", "fetch"):
+        return await afetch(ids[:TOP_K], with_vectors=MMR)
+
+def _fill(points: list, more: list) -> list:
+    # Dense/lexical retrieval only fills the slots the named provision left
+    have = {str(p.id) for p in points}
+    return points + [p for p in more if str(p.id) not in have]
+
+def _snippets(points: list, pinned: int = 0) -> tuple[list[dict], dict]:
+    """
+    Pick the context (MMR for variety, the first `pinned` being the named
+    provision; else the top TOP_K) and pack it under the prompt-token budget.
+    """
+    with span("query", "pack"):
+        if MMR:
+            points = select_mmr(points, TOP_K, MMR_LAMBDA, MMR_SIM_THRESHOLD,
+                                MMR_MAX_PER_DOC, MMR_MAX_PER_PAGE, pinned=pinned)
+        return pack_context(points[:TOP_K])
+
+def _prompt(q: str, snippets: list[dict], usage: dict) -> list[dict]:
+    with span("query", "prompt"):
+        messages = build_messages(q, snippets, CITE_MODE)
+    usage["prompt_tokens"] = sum(count_tokens(m["content"]) for m in messages)
+    return messages
+
+def _output_usage(usage: dict, raw: str, data, t0: float):
+    """
+    Completion size and time. In "ids" cite mode, also what copying the
+    citation text would have cost: the tokens of the hydrated answer beyond
+    the raw one, priced at this completion's own ms per output token.
+    """
+    usage["completion_tokens"] = count_tokens(raw)
+    usage["generate_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    if CITE_MODE == "ids" and isinstance(data, dict) and usage["completion_tokens"]:
+        saved = max(0, count_tokens(json.dumps(data, ensure_ascii=False)) - usage["completion_tokens"])
+        usage["citation_tokens_saved"] = saved
+        usage["est_ms_saved"] = round(saved * usage["generate_ms"] / usage["completion_tokens"], 1)
+    for kind, field in (("prompt", "prompt_tokens"), ("context", "context_tokens"),
+                        ("completion", "completion_tokens"), ("citation_saved", "citation_tokens_saved")):
+        TOKENS.inc(usage.get(field, 0), kind=kind)
+
+async def _generate(q: str, points: list, pinned: int = 0):
+    snippets, usage = _snippets(points, pinned)
+    messages = _prompt(q, snippets, usage)
+    t0 = time.perf_counter()
+    with span("query", "llm"):
+        raw = await aget_json_answer(messages)
+    with span("query", "repair"):
+        data = await aparse_or_repair(raw, snippets)
+    _output_usage(usage, raw, data, t0)
+    return data, raw, usage
+
+async def _answer(q: str, d: dict, cache: dict):
+    """Retrieve and answer `q`; every I/O step awaits an async client."""
+    q2 = rewrite_query(q, d["boosts"])
+    points = await _direct(d)
+    pinned = len(points)
+    if len(points) < TOP_K:
+        points = _fill(points, await _retrieve(q2, d["filter"], cache))
+    else:
+        cache["vector"] = "skipped"
+    return await _generate(q, points, pinned)
+
+def _validate(key, data: dict, raw: str) -> dict | None:
+    """Check the answer against AnswerJSON and cache it; returns the error body if invalid."""
+    try:
+        AnswerJSON(**data)
+    except Exception as e:
+        return {"error": f"JSON validation failed: {e}", "raw_response": raw}
+    if QUERY_CACHE:
+        answer_cache.put(key, data)
+    return None
+
+async def _until_done_or_gone(request: Request, task: asyncio.Task, timeout: float) -> str | None:
+    """Wait for `task`; cancel it if the client disconnects or the deadline passes."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not task.done():
+        left = deadline - loop.time()
+        if left <= 0:
+            task.cancel()
+            return "timeout"
+        await asyncio.wait({task}, timeout=min(0.25, left))
+        if not task.done() and await request.is_disconnected():
+            task.cancel()
+            return "disconnected"
+    return None
 
 @app.post("/query")
-async def query(body: dict, format: str = Query(default="json")):
+async def query(request: Request, body: dict, format: str = Query(default="json")):
     q = body.get("query", "").strip()
     if not q:
         return JSONResponse({"error": "empty query"}, status_code=400)
 
-    d = decision_agent(q)
-    q2 = rewrite_query(q, d["boosts"])
-    q_vec = embed_texts([q2])[0]
-    points = search(q_vec, top_k=3 * TOP_K, payload_filter=d["filter"])
+    with span("query", "decision"):
+        d = decision_agent(q)
+    key = _answer_key(q, d["filter"]) if QUERY_CACHE else None
+    cached = answer_cache.get(key) if QUERY_CACHE else None
+    usage = None
+    if cached is not None:
+        data = {**cached, "query": q}
+        cache = {"answer": "hit", "vector": "skipped", "generation": key[3]}
+    else:
+        cache = {"answer": "miss" if QUERY_CACHE else "off", "generation": key[3] if key else None}
+        task = asyncio.create_task(_answer(q, d, cache))
+        aborted = await _until_done_or_gone(request, task, QUERY_TIMEOUT)
+        if aborted == "timeout":
+            return JSONResponse({"error": f"query timed out after {QUERY_TIMEOUT:g}s"}, status_code=504)
+        if aborted == "disconnected":
+            return JSONResponse({"error": "client disconnected"}, status_code=499)
+        data, raw, usage = task.result()
 
-    # Dedupe
-    seen_ids = set()
-    unique_points = []
-    for p in points:
-        if p.id not in seen_ids:
-            seen_ids.add(p.id)
-            unique_points.append(p)
+        error = _validate(key, data, raw)
+        if error:
+            return JSONResponse(error, status_code=500)
 
-    snippets = build_snippets(unique_points[:TOP_K])
+    headers = {"X-Cache": cache["answer"]}
+    if format == "html":
+        with span("query", "render"):
+            html = render_html(data)
+        return HTMLResponse(content=html, media_type="text/html", headers=headers)
+
+    return JSONResponse({**data, "cache": cache, "usage": usage}, headers=headers)
 
-    messages = build_messages(q, snippets)
-    raw = get_json_answer(messages)
-    data = parse_or_repair(raw)
+async def _batch(qs: list[str]):
+    """NDJSON lines, one per query, in completion order (cache hits first)."""
+    def line(i, status, body):
+        return json.dumps({"index": i, "query": qs[i], "status": status, **body}, ensure_ascii=False) + "\n"
+
+    with span("query", "decision", len(qs)):
+        ds = [decision_agent(q) for q in qs]
+    keys = [_answer_key(q, d["filter"]) for q, d in zip(qs, ds)]
+    # Repeats within the batch share the first occurrence's answer
+    todo, first, same = [], {}, {}
+    for i, key in enumerate(keys):
+        cached = answer_cache.get(key) if QUERY_CACHE else None
+        if cached is not None:
+            yield line(i, 200, {**cached, "query": qs[i], "cache": "hit"})
+        elif key in first:
+            same.setdefault(first[key], []).append(i)
+        else:
+            first[key] = i
+            todo.append(i)
+    if not todo:
+        return
 
     try:
-        AnswerJSON(**data)
+        points = dict(zip(todo, await asyncio.gather(*(_direct(ds[i]) for i in todo))))
+        pinned = {i: len(points[i]) for i in todo}
+        need = [i for i in todo if len(points[i]) < TOP_K]
+        if need:
+            fills = await _retrieve_batch([rewrite_query(qs[i], ds[i]["boosts"]) for i in need],
+                                          [ds[i]["filter"] for i in need])
+            for i, more in zip(need, fills):
+                points[i] = _fill(points[i], more)
     except Exception as e:
-        return JSONResponse(
-            {"error": f"JSON validation failed: {e}", "raw_response": raw},
-            status_code=500
-        )
+        for i in todo:
+            for j in [i, *same.get(i, [])]:
+                yield line(j, 502, {"error": f"retrieval failed: {e}"})
+        return
 
-    if format == "html":
-        html = render_html(data)
-        return HTMLResponse(content=html, media_type="text/html")
+    sem = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
+
+    async def one(i):
+        async with sem:
+            try:
+                return i, *(await _generate(qs[i], points[i], pinned[i])), None
+            except Exception as e:
+                return i, None, None, None, e
+
+    tasks = [asyncio.create_task(one(i)) for i in todo]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            i, data, raw, usage, exc = await fut
+            error = _validate(keys[i], data, raw) if exc is None else None
+            for j in [i, *same.get(i, [])]:
+                if exc is not None:
+                    yield line(j, 502, {"error": f"answer failed: {exc}"})
+                elif error:
+                    yield line(j, 500, error)
+                else:
+                    yield line(j, 200, {**data, "query": qs[j], "cache": "miss", "usage": usage})
+    finally:
+        # Client went away (or the stream errored): stop the remaining LLM calls
+        for t in tasks:
+            t.cancel()
+
+@app.post("/query/batch")
+async def query_batch(body: dict):
+    qs = body.get("queries")
+    if not isinstance(qs, list) or not all(isinstance(q, str) for q in qs):
+        qs = []
+    qs = [q.strip() for q in qs]
+    if not qs or not all(qs):
+        return JSONResponse({"error": "queries must be a non-empty list of non-empty strings"}, status_code=400)
+    if len(qs) > QUERY_BATCH_MAX:
+        return JSONResponse({"error": f"at most {QUERY_BATCH_MAX} queries per batch"}, status_code=413)
+    return StreamingResponse(_batch(qs), media_type="application/x-ndjson")
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream(q: str):
+    """
+    SSE events: "sources" as soon as retrieval is done, "token" deltas of the
+    answer text while the model writes it, then "answer" with the validated
+    AnswerJSON (or "error"). The final event carries the server-side timings.
+    """
+    t0 = time.perf_counter()
+    ms = lambda: round((time.perf_counter() - t0) * 1000, 1)
+    timings = {}
+
+    with span("query", "decision"):
+        d = decision_agent(q)
+    key = _answer_key(q, d["filter"])
+    cached = answer_cache.get(key) if QUERY_CACHE else None
+    if cached is not None:
+        timings["first_byte_ms"] = timings["total_ms"] = ms()
+        yield _sse("answer", {**cached, "query": q, "cache": {"answer": "hit"}, "timings": timings})
+        return
+
+    cache = {"answer": "miss" if QUERY_CACHE else "off", "generation": key[3]}
+    loop = asyncio.get_running_loop()
+    # The budget /query gives retrieval, generation and repair, shared by every await below
+    deadline = loop.time() + QUERY_TIMEOUT
+    within = lambda aw: asyncio.wait_for(aw, deadline - loop.time())
+    timed_out = _sse("error", {"error": f"query timed out after {QUERY_TIMEOUT:g}s"})
+    try:
+        q2 = rewrite_query(q, d["boosts"])
+        points = await within(_direct(d))
+        pinned = len(points)
+        if len(points) < TOP_K:
+            points = _fill(points, await within(_retrieve(q2, d["filter"], cache)))
+        else:
+            cache["vector"] = "skipped"
+        snippets, usage = _snippets(points, pinned)
+    except asyncio.TimeoutError:
+        yield timed_out
+        return
+    except Exception as e:
+        yield _sse("error", {"error": f"retrieval failed: {e}"})
+        return
+    timings["first_byte_ms"] = ms()
+    yield _sse("sources", {"sources": [{k: s[k] for k in ("n", "source", "page")} for s in snippets]})
+
+    text, parts = AnswerTextStream(), []
+    messages = _prompt(q, snippets, usage)
+    t_gen = time.perf_counter()
+    try:
+        # Includes the time spent handing tokens to the client, as the stream is paced by both
+        with span("query", "llm"):
+            deltas = astream_json_answer(messages)
+            try:
+                while True:
+                    try:
+                        delta = await within(anext(deltas))
+                    except StopAsyncIteration:
+                        break
+                    parts.append(delta)
+                    shown = text.feed(delta)
+                    if shown:
+                        timings.setdefault("first_token_ms", ms())
+                        yield _sse("token", {"text": shown})
+            finally:
+                await deltas.aclose()
+        raw = "".join(parts)
+        with span("query", "repair"):
+            data = await within(aparse_or_repair(raw, snippets))
+        _output_usage(usage, raw, data, t_gen)
+    except asyncio.TimeoutError:
+        yield timed_out
+        return
+    except Exception as e:
+        yield _sse("error", {"error": f"answer failed: {e}"})
+        return
+
+    error = _validate(key, data, raw)
+    timings["total_ms"] = ms()
+    if error:
+        yield _sse("error", {**error, "timings": timings})
+    else:
+        yield _sse("answer", {**data, "cache": cache, "usage": usage, "timings": timings})
+
+@app.post("/query/stream")
+async def query_stream(body: dict):
+    q = body.get("query", "").strip()
+    if not q:
+        return JSONResponse({"error": "empty query"}, status_code=400)
+    return StreamingResponse(_stream(q), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"generation": manifest().generation(),
+            "vector": vector_cache.stats(), "answer": answer_cache.stats()}
+
+@app.get("/repair/stats")
+def get_repair_stats():
+    return repair_stats.snapshot()
+
+# Cache and repair counters live in their own objects; read them at scrape time
+def _cache_metric(field: str) -> dict:
+    return {(name,): c.stats()[field] for name, c in (("vector", vector_cache), ("answer", answer_cache))}
+
+Collected("legal_cache_hits_total", "Query cache hits.", "counter", lambda: _cache_metric("hits"), ("cache",))
+Collected("legal_cache_misses_total", "Query cache misses.", "counter", lambda: _cache_metric("misses"), ("cache",))
+Collected("legal_cache_entries", "Entries held per query cache.", "gauge",
+          lambda: _cache_metric("entries"), ("cache",))
+Collected("legal_answer_parse_total", "Answer JSON parses by outcome (clean, local, llm, failed).", "counter",
+          lambda: {(k,): v for k, v in repair_stats.snapshot()["outcomes"].items()}, ("outcome",))
+Collected("legal_answer_repair_causes_total", "Local repair causes.", "counter",
+          lambda: {(k,): v for k, v in repair_stats.snapshot()["causes"].items()}, ("cause",))
 
-    return JSONResponse(data)
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,81 @@
+import hashlib, sqlite3, threading, time, unicodedata
+from array import array
+from pathlib import Path
+
+# SQLite caps bound parameters per statement on older builds
+_IN_CHUNK = 500
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbedCache:
+    """
+    Persistent embedding cache: SQLite rows of packed float32 vectors keyed by
+    sha256(model, dim, normalized text). Least-recently-used rows are evicted
+    once the table grows past `max_entries`.
+    """
+
+    def __init__(self, path: str, model: str, dim: int, max_entries: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.model, self.dim, self.max_entries = model, dim, max_entries
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS emb "
+                         "(key BLOB PRIMARY KEY, vec BLOB NOT NULL, used REAL NOT NULL) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS emb_used ON emb(used)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM emb").fetchone()[0]
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{self.dim}\0{normalize(text)}".encode()).digest()
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            uniq = list(set(keys))
+            for i in range(0, len(uniq), _IN_CHUNK):
+                part = uniq[i:i + _IN_CHUNK]
+                marks = ",".join("?" * len(part))
+                found.update(self._db.execute(
+                    f"SELECT key, vec FROM emb WHERE key IN ({marks})", part).fetchall())
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE emb SET used=? WHERE key=?", [(now, k) for k in found])
+                self._db.commit()
+            hits = sum(k in found for k in keys)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        out = []
+        for k in keys:
+            blob = found.get(k)
+            out.append(array("f", blob).tolist() if blob is not None else None)
+        return out
+
+    def put_many(self, texts: list[str], vecs: list[list[float]]):
+        now = time.time()
+        rows = [(self._key(t), array("f", v).tobytes(), now) for t, v in zip(texts, vecs)]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO emb (key, vec, used) VALUES (?, ?, ?)", rows)
+            self._count += self._db.total_changes - before
+            if self._count > self.max_entries:
+                # Evict down to 90% so we don't pay for an eviction on every insert
+                drop = self._count - int(self.max_entries * 0.9)
+                self._db.execute("DELETE FROM emb WHERE key IN "
+                                 "(SELECT key FROM emb ORDER BY used LIMIT ?)", (drop,))
+                self._count = self._db.execute("SELECT COUNT(*) FROM emb").fetchone()[0]
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, hits, misses = self._count, self.hits, self.misses
+        total = hits + misses
+        return {"entries": entries, "hits": hits, "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0}
@@ -0,0 +1,138 @@
+import re, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from core.tokens import count_tokens
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_S = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: str | None) -> float:
+    """Parse rate-limit reset headers such as "20ms", "1.5s" or "6m0s" into seconds."""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(n) * _UNIT_S[u] for n, u in _DURATION_RE.findall(value))
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float = 0.0):
+        super().__init__(f"rate limited, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class EmbedScheduler:
+    """
+    Packs texts into requests by token count and keeps several of them in
+    flight. Concurrency is adaptive (AIMD): halved on a 429, raised by one
+    after each success, and requests pause when the rate-limit headers say
+    the token budget is nearly spent.
+
+    `request(texts)` must return (vectors, headers, used_tokens) and raise
+    RateLimited on HTTP 429.
+    """
+
+    def __init__(self, request, max_batch_tokens: int, max_batch_inputs: int,
+                 max_concurrency: int, max_retries: int = 6):
+        self.request = request
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.limit = self.max_concurrency
+        self._inflight = 0
+        self._paused_until = 0.0
+        self._cv = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                        thread_name_prefix="embed")
+        self.tokens = self.requests = self.throttled = 0
+        self.busy_s = 0.0
+        self.last_tokens_per_s = 0.0
+
+    def pack(self, texts: list[str]) -> list[tuple[int, int]]:
+        """Split texts into consecutive [start, stop) ranges under the token and input caps."""
+        ranges, start, budget = [], 0, 0
+        for i, t in enumerate(texts):
+            n = count_tokens(t)
+            if i > start and (budget + n > self.max_batch_tokens or i - start >= self.max_batch_inputs):
+                ranges.append((start, i))
+                start, budget = i, 0
+            budget += n
+        if start < len(texts):
+            ranges.append((start, len(texts)))
+        return ranges
+
+    def _acquire(self):
+        with self._cv:
+            while True:
+                paused = self._paused_until - time.monotonic()
+                if paused <= 0 and self._inflight < self.limit:
+                    break
+                self._cv.wait(timeout=paused if paused > 0 else None)
+            self._inflight += 1
+
+    def _release(self, ok: bool, pause: float = 0.0):
+        with self._cv:
+            self._inflight -= 1
+            if ok:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+            else:
+                self.limit = max(1, self.limit // 2)
+            if pause:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._cv.notify_all()
+
+    def _run(self, texts: list[str]):
+        delay = 0.5
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                vecs, headers, used = self.request(texts)
+            except RateLimited as e:
+                self.throttled += 1
+                wait = e.retry_after or delay
+                self._release(ok=False, pause=wait)
+                if attempt == self.max_retries:
+                    raise
+                delay = min(delay * 2, 30.0)
+                continue
+            except Exception:
+                self._release(ok=False)
+                raise
+
+            # Pause proactively when the token window is almost used up
+            pause = 0.0
+            remaining = headers.get("x-ratelimit-remaining-tokens")
+            if remaining is not None and remaining.isdigit() and int(remaining) < self.max_batch_tokens:
+                pause = parse_reset(headers.get("x-ratelimit-reset-tokens"))
+            self._release(ok=True, pause=pause)
+            with self._cv:
+                self.tokens += used
+                self.requests += 1
+            return vecs
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        t0, tokens0 = time.perf_counter(), self.tokens
+        ranges = self.pack(texts)
+        futures = [self._pool.submit(self._run, texts[a:b]) for a, b in ranges]
+        out = []
+        for f in futures:
+            out.extend(f.result())
+
+        elapsed = time.perf_counter() - t0
+        self.busy_s += elapsed
+        self.last_tokens_per_s = (self.tokens - tokens0) / elapsed if elapsed else 0.0
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "throttled": self.throttled,
+            "concurrency": self.limit,
+            "tokens_per_s": round(self.tokens / self.busy_s, 1) if self.busy_s else 0.0,
+            "last_tokens_per_s": round(self.last_tokens_per_s, 1),
+        }
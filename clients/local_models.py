@@ -0,0 +1,73 @@
+import hashlib, json, re
+from functools import lru_cache
+import numpy as np
+from core.config import EMBED_DIM
+from core.tokens import estimate_tokens
+
+# Offline stand-ins for the OpenAI models (EMBED_PROVIDER=hash,
+# CHAT_PROVIDER=canned): deterministic, dependency-free and fast enough that
+# benchmarks measure our pipeline rather than the model.
+
+_WORD = re.compile(r"\w+")
+_SNIPPET = re.compile(r"^\[(\d+)\] \((.+?), p\.(-?\d+)\): (.*)$", re.M)
+_SENTENCE_END = re.compile(r"(?<=[.?!।])\s")
+INSUFFICIENT = "Insufficient information in provided sources."
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return h % dim, 1.0 if h >> 63 else -1.0
+
+
+def hash_embed(texts: list[str], dim: int = EMBED_DIM) -> list[list[float]]:
+    """
+    Feature-hashing embeddings over casefolded word unigrams and bigrams,
+    L2-normalised. Texts that share words score close under cosine, so
+    retrieval behaves plausibly; the same text always gets the same vector.
+    """
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = _WORD.findall(text.casefold())
+        for f in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            i, sign = _bucket(f, dim)
+            out[row, i] += sign
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return (out / np.where(norms == 0, 1, norms)).tolist()
+
+
+def hash_embed_request(texts: list[str]):
+    """EmbedScheduler request: (vectors, headers, used_tokens) with no rate limits to report."""
+    return hash_embed(texts), {}, sum(estimate_tokens(t) for t in texts)
+
+
+def _first_sentence(text: str, limit: int = 300) -> str:
+    s = _SENTENCE_END.split(text.strip(), 1)[0]
+    return s if len(s) <= limit else s[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def canned_chat(messages: list[dict]) -> str:
+    """
+    A JSON answer shaped like the real model's, built from the prompt: the
+    opening sentence of the first two snippets with [n] markers, cited the
+    way the system prompt asks (snippet numbers or copied text). Repair
+    requests get their input back unchanged.
+    """
+    system, user = messages[0]["content"], messages[-1]["content"]
+    if user.startswith("Repair the following"):
+        return user.split("\n\n", 1)[-1]
+    q = user.split("Question:\n", 1)[-1].split("\n\nSnippets:", 1)[0].strip()
+    snippets = [(int(n), src, int(page), text) for n, src, page, text in _SNIPPET.findall(user)][:2]
+    answer = " ".join(f"{_first_sentence(text)} [{n}]" for n, _, _, text in snippets)
+    data = {"query": q, "answer": answer or INSUFFICIENT}
+    if '"cited"' in system:
+        data["cited"] = [n for n, *_ in snippets]
+    else:
+        data["citations"] = [{"source": src, "page": page, "snippet": text} for _, src, page, text in snippets]
+    return json.dumps(data, ensure_ascii=False)
+
+
+def canned_chat_stream(messages: list[dict], piece: int = 16):
+    text = canned_chat(messages)
+    for i in range(0, len(text), piece):
+        yield text[i:i + piece]
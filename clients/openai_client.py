@@ -1,13 +1,63 @@
-from openai import OpenAI
-from core.config import EMBED_MODEL, GEN_MODEL
+import asyncio
+from openai import OpenAI, AsyncOpenAI, RateLimitError
+from core.config import (EMBED_MODEL, GEN_MODEL, EMBED_DIM, OPENAI_TIMEOUT,
+                         EMBED_CACHE, EMBED_CACHE_PATH, EMBED_CACHE_MAX,
+                         EMBED_MAX_BATCH_TOKENS, EMBED_MAX_BATCH_INPUTS, EMBED_CONCURRENCY,
+                         EMBED_PROVIDER, CHAT_PROVIDER)
+from clients.embed_cache import EmbedCache
+from clients.embed_scheduler import EmbedScheduler, RateLimited, parse_reset
+from clients.local_models import hash_embed, hash_embed_request, canned_chat, canned_chat_stream
 
-client = OpenAI()
+if EMBED_PROVIDER not in ("openai", "hash"):
+    raise ValueError(f"EMBED_PROVIDER must be openai or hash, not {EMBED_PROVIDER!r}")
+if CHAT_PROVIDER not in ("openai", "canned"):
+    raise ValueError(f"CHAT_PROVIDER must be openai or canned, not {CHAT_PROVIDER!r}")
+
+# Offline providers need no key, so the SDK clients exist only when something uses them
+_uses_openai = "openai" in (EMBED_PROVIDER, CHAT_PROVIDER)
+client = OpenAI(timeout=OPENAI_TIMEOUT) if _uses_openai else None
+aclient = AsyncOpenAI(timeout=OPENAI_TIMEOUT) if _uses_openai else None
+
+# Hash vectors are cheaper to compute than to look up, and must not land in the model's cache
+embed_cache = (EmbedCache(EMBED_CACHE_PATH, EMBED_MODEL, EMBED_DIM, EMBED_CACHE_MAX)
+               if EMBED_CACHE and EMBED_PROVIDER == "openai" else None)
+
+# The scheduler owns retries/backoff for embeddings, so the SDK must not retry 429s itself
+_embed_client = client.with_options(max_retries=0) if client else None
+
+def _openai_embed_request(texts: list[str]):
+    try:
+        raw = _embed_client.embeddings.with_raw_response.create(model=EMBED_MODEL, input=texts)
+    except RateLimitError as e:
+        h = e.response.headers
+        raise RateLimited(parse_reset(h.get("retry-after") or h.get("x-ratelimit-reset-tokens"))) from e
+    resp = raw.parse()
+    return [d.embedding for d in resp.data], raw.headers, resp.usage.total_tokens
+
+_embed_request = hash_embed_request if EMBED_PROVIDER == "hash" else _openai_embed_request
+
+embed_scheduler = EmbedScheduler(_embed_request, EMBED_MAX_BATCH_TOKENS,
+                                 EMBED_MAX_BATCH_INPUTS, EMBED_CONCURRENCY)
+
+def _embed_api(texts: list[str]) -> list[list[float]]:
+    return embed_scheduler.embed(texts)
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
-    resp = client.embeddings.create(model=EMBED_MODEL, input=texts)
-    return [d.embedding for d in resp.data]
+    if embed_cache is None:
+        return _embed_api(texts)
+
+    vecs = embed_cache.get_many(texts)
+    miss = [i for i, v in enumerate(vecs) if v is None]
+    if miss:
+        fresh = _embed_api([texts[i] for i in miss])
+        embed_cache.put_many([texts[i] for i in miss], fresh)
+        for i, v in zip(miss, fresh):
+            vecs[i] = v
+    return vecs
 
 def chat_json(messages: list[dict], max_tokens=800):
+    if CHAT_PROVIDER == "canned":
+        return canned_chat(messages)
     return client.chat.completions.create(
         model=GEN_MODEL,
         temperature=0,
@@ -15,3 +65,50 @@ def chat_json(messages: list[dict], max_tokens=800):
         messages=messages,
         max_tokens=max_tokens
     ).choices[0].message.content
+
+# Async variants for the request path: nothing here blocks the event loop.
+
+async def aembed_texts(texts: list[str]) -> list[list[float]]:
+    if EMBED_PROVIDER == "hash":
+        return hash_embed(texts)
+    vecs = await asyncio.to_thread(embed_cache.get_many, texts) if embed_cache else [None] * len(texts)
+    miss = [i for i, v in enumerate(vecs) if v is None]
+    if miss:
+        # Through the scheduler, so request-path embeds share the ingest's rate-limit budget
+        fresh = await asyncio.to_thread(embed_scheduler.embed, [texts[i] for i in miss])
+        if embed_cache:
+            await asyncio.to_thread(embed_cache.put_many, [texts[i] for i in miss], fresh)
+        for i, v in zip(miss, fresh):
+            vecs[i] = v
+    return vecs
+
+async def achat_json(messages: list[dict], max_tokens=800):
+    if CHAT_PROVIDER == "canned":
+        return canned_chat(messages)
+    resp = await aclient.chat.completions.create(
+        model=GEN_MODEL,
+        temperature=0,
+        response_format={"type": "json_object"},
+        messages=messages,
+        max_tokens=max_tokens
+    )
+    return resp.choices[0].message.content
+
+async def achat_json_stream(messages: list[dict], max_tokens=800):
+    """Like achat_json, but yields the completion's text deltas as they arrive."""
+    if CHAT_PROVIDER == "canned":
+        for piece in canned_chat_stream(messages):
+            yield piece
+        return
+    stream = await aclient.chat.completions.create(
+        model=GEN_MODEL,
+        temperature=0,
+        response_format={"type": "json_object"},
+        messages=messages,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    async with stream:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -1,16 +1,192 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
-from core.config import QDRANT_URL, QDRANT_API_KEY
+import asyncio, threading
+import httpx
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (Distance, VectorParams, VectorParamsDiff, HnswConfigDiff,
+                                  ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+                                  BinaryQuantization, BinaryQuantizationConfig, Disabled,
+                                  SearchParams, QuantizationSearchParams, PayloadSchemaType)
+from core.config import (QDRANT_URL, QDRANT_API_KEY, QDRANT_PATH, QDRANT_PREFER_GRPC, QDRANT_GRPC_PORT,
+                         QDRANT_POOL_SIZE, QDRANT_TIMEOUT, EMBED_DIM,
+                         QDRANT_QUANTIZATION, QDRANT_QUANT_ALWAYS_RAM, QDRANT_RESCORE,
+                         QDRANT_OVERSAMPLING, QDRANT_ON_DISK, QDRANT_HNSW_M,
+                         QDRANT_HNSW_EF_CONSTRUCT, QDRANT_SEARCH_EF)
 
 COLLECTION = "legal_mvp"
 
-def qdrant():
-    return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+# Every payload field a query or ingest filter touches: corpus (decision_agent),
+# doc_name/page/doc_sha (stale-page deletes), lang_detected.
+PAYLOAD_INDEXES = {
+    "corpus": PayloadSchemaType.KEYWORD,
+    "doc_name": PayloadSchemaType.KEYWORD,
+    "lang_detected": PayloadSchemaType.KEYWORD,
+    "doc_sha": PayloadSchemaType.KEYWORD,
+    "page": PayloadSchemaType.INTEGER,
+}
 
-def ensure_collection(client, dim=1536):
+# gRPC keep-alive: ping idle channels so proxies/NAT don't silently drop them
+GRPC_OPTIONS = {
+    "grpc.keepalive_time_ms": 30_000,
+    "grpc.keepalive_timeout_ms": 10_000,
+    "grpc.keepalive_permit_without_calls": 1,
+    "grpc.http2.max_pings_without_data": 0,
+}
+
+_client = _aclient = None
+_lock = threading.Lock()
+_ensured = set()
+
+def _client_args(prefer_grpc: bool) -> dict:
+    return dict(
+        url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=QDRANT_TIMEOUT,
+        prefer_grpc=prefer_grpc, grpc_port=QDRANT_GRPC_PORT, grpc_options=GRPC_OPTIONS,
+        limits=httpx.Limits(max_connections=QDRANT_POOL_SIZE,
+                            max_keepalive_connections=QDRANT_POOL_SIZE,
+                            keepalive_expiry=60),
+    )
+
+class _Serialized:
+    """
+    Qdrant local mode (QDRANT_PATH): an in-process, on-disk store with exact
+    NumPy search. It holds a file lock, so one instance serves the whole
+    process, and it is not thread-safe, so every call takes this lock.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return call
+
+
+class _AsyncLocal:
+    """The request path's async client in local mode: the shared instance, called off the event loop."""
+
+    def __init__(self, client: _Serialized):
+        self._client = client
+
+    def __getattr__(self, name):
+        fn = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return call
+
+
+def make_client(prefer_grpc: bool = QDRANT_PREFER_GRPC) -> QdrantClient:
+    """A new client with a keep-alive connection pool (REST) or a multiplexed channel (gRPC)."""
+    if QDRANT_PATH:
+        # The local store allows one instance per path, and closing it would close qdrant()'s
+        raise ValueError("make_client needs a Qdrant server; with QDRANT_PATH set use qdrant()")
+    return QdrantClient(**_client_args(prefer_grpc))
+
+def qdrant() -> QdrantClient:
+    """Process-wide shared client; QdrantClient is thread-safe."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if QDRANT_PATH:
+                    _client = _Serialized(QdrantClient(path=QDRANT_PATH, force_disable_check_same_thread=True))
+                else:
+                    _client = QdrantClient(**_client_args(QDRANT_PREFER_GRPC))
+    return _client
+
+def aqdrant() -> AsyncQdrantClient:
+    """Process-wide async client for the request path (created on the server's event loop)."""
+    global _aclient
+    if _aclient is None:
+        _aclient = _AsyncLocal(qdrant()) if QDRANT_PATH else AsyncQdrantClient(**_client_args(QDRANT_PREFER_GRPC))
+    return _aclient
+
+def quantization_config(kind: str = QDRANT_QUANTIZATION):
+    if kind == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=QDRANT_QUANT_ALWAYS_RAM))
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=QDRANT_QUANT_ALWAYS_RAM))
+    if kind == "none":
+        return None
+    raise ValueError(f"QDRANT_QUANTIZATION must be none, scalar or binary, not {kind!r}")
+
+def hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+def search_params() -> SearchParams:
+    """Query-time HNSW ef; with quantization, oversample and rescore against the original vectors."""
+    quant = None
+    if QDRANT_QUANTIZATION != "none":
+        quant = QuantizationSearchParams(rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING)
+    return SearchParams(hnsw_ef=QDRANT_SEARCH_EF, quantization=quant)
+
+def ensure_payload_indexes(client, dry_run: bool = False) -> list[str]:
+    """Create any missing keyword/integer payload indexes. Returns the fields created."""
+    if QDRANT_PATH:
+        return []  # local mode scans payloads directly and has no index to build
+    have = client.get_collection(COLLECTION).payload_schema or {}
+    missing = [f for f in PAYLOAD_INDEXES if f not in have]
+    if not dry_run:
+        for field in missing:
+            client.create_payload_index(collection_name=COLLECTION, field_name=field,
+                                        field_schema=PAYLOAD_INDEXES[field], wait=True)
+    return missing
+
+def ensure_collection(client, dim=EMBED_DIM):
+    if COLLECTION in _ensured:
+        return
     collections = [c.name for c in client.get_collections().collections]
     if COLLECTION not in collections:
-        client.recreate_collection(
+        client.create_collection(
+            collection_name=COLLECTION,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=QDRANT_ON_DISK),
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config(),
+        )
+    ensure_payload_indexes(client)
+    _ensured.add(COLLECTION)
+
+def _quant_kind(cfg) -> str:
+    if isinstance(cfg, ScalarQuantization):
+        return "scalar"
+    if isinstance(cfg, BinaryQuantization):
+        return "binary"
+    return "none" if cfg is None else type(cfg).__name__
+
+def migrate_collection(client, dry_run: bool = False) -> dict:
+    """
+    Bring an existing collection in line with the configured HNSW, quantization,
+    on-disk and payload-index settings. Qdrant rebuilds the affected segments in
+    the background; the collection keeps serving meanwhile.
+    """
+    cfg = client.get_collection(COLLECTION).config
+    changes = {}
+    hnsw = cfg.hnsw_config
+    if (hnsw.m, hnsw.ef_construct) != (QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT):
+        changes["hnsw"] = {"from": {"m": hnsw.m, "ef_construct": hnsw.ef_construct},
+                           "to": {"m": QDRANT_HNSW_M, "ef_construct": QDRANT_HNSW_EF_CONSTRUCT}}
+    current = _quant_kind(cfg.quantization_config)
+    if current != QDRANT_QUANTIZATION:
+        changes["quantization"] = {"from": current, "to": QDRANT_QUANTIZATION}
+    on_disk = bool(cfg.params.vectors.on_disk)
+    if on_disk != QDRANT_ON_DISK:
+        changes["on_disk"] = {"from": on_disk, "to": QDRANT_ON_DISK}
+
+    if not dry_run and changes:
+        quant = None
+        if "quantization" in changes:
+            quant = quantization_config() or Disabled.DISABLED
+        client.update_collection(
             collection_name=COLLECTION,
-            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+            hnsw_config=hnsw_config() if "hnsw" in changes else None,
+            quantization_config=quant,
+            vectors_config={"": VectorParamsDiff(on_disk=QDRANT_ON_DISK)} if "on_disk" in changes else None,
         )
+    changes["payload_indexes_created"] = ensure_payload_indexes(client, dry_run=dry_run)
+    return changes
@@ -0,0 +1,46 @@
+import threading, time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    In-process LRU map whose entries also expire `ttl_s` seconds after they
+    were stored. Thread-safe; values are returned as stored, so callers must
+    not mutate them.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries, self.ttl_s = max_entries, ttl_s
+        self.hits = self.misses = self.expired = 0
+        self._data = OrderedDict()     # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < time.monotonic():
+                del self._data[key]
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                "expired": self.expired, "hit_rate": round(self.hits / total, 4) if total else 0.0}
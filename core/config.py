@@ -10,3 +10,65 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 TOP_K = int(os.getenv("TOP_K", "8"))
 USE_TRANSLATION = os.getenv("USE_TRANSLATION", "false").lower() == "true"
 LANGS_OCR = os.getenv("LANGS_OCR", "eng+hin+tam+tel")
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "1"))
+EMBED_DIM = int(os.getenv("EMBED_DIM", "1536"))
+DATA_DIR = os.getenv("DATA_DIR", "data")
+EMBED_CACHE = os.getenv("EMBED_CACHE", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(DATA_DIR, "embed_cache.sqlite"))
+EMBED_CACHE_MAX = int(os.getenv("EMBED_CACHE_MAX", "200000"))
+EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "16000"))
+EMBED_MAX_BATCH_INPUTS = int(os.getenv("EMBED_MAX_BATCH_INPUTS", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(DATA_DIR, "jobs"))
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+OCR_CACHE = os.getenv("OCR_CACHE", "true").lower() == "true"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(DATA_DIR, "ocr_cache.sqlite"))
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "false").lower() == "true"
+OCR_DPI_LOW = int(os.getenv("OCR_DPI_LOW", "150"))
+OCR_MIN_CONF = float(os.getenv("OCR_MIN_CONF", "75"))
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", os.path.join(DATA_DIR, "manifest.sqlite"))
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "450"))
+CHUNK_CROSS_PAGE = os.getenv("CHUNK_CROSS_PAGE", "false").lower() == "true"
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "16"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "90"))
+QUERY_CACHE = os.getenv("QUERY_CACHE", "true").lower() == "true"
+VECTOR_CACHE_MAX = int(os.getenv("VECTOR_CACHE_MAX", "10000"))
+VECTOR_CACHE_TTL = float(os.getenv("VECTOR_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX = int(os.getenv("ANSWER_CACHE_MAX", "2000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+LEXICAL = os.getenv("LEXICAL", "true").lower() == "true"
+LEXICAL_PATH = os.getenv("LEXICAL_PATH", os.path.join(DATA_DIR, "lexical.sqlite"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+SECTIONS_PATH = os.getenv("SECTIONS_PATH", os.path.join(DATA_DIR, "sections.sqlite"))
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "scalar").lower()   # none | scalar | binary
+QDRANT_QUANT_ALWAYS_RAM = os.getenv("QDRANT_QUANT_ALWAYS_RAM", "true").lower() == "true"
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "128"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "500"))
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "8"))
+MMR = os.getenv("MMR", "true").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_SIM_THRESHOLD = float(os.getenv("MMR_SIM_THRESHOLD", "0.92"))
+MMR_MAX_PER_DOC = int(os.getenv("MMR_MAX_PER_DOC", "6"))
+MMR_MAX_PER_PAGE = int(os.getenv("MMR_MAX_PER_PAGE", "2"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MAX_SNIPPET_TOKENS = int(os.getenv("CONTEXT_MAX_SNIPPET_TOKENS", "400"))
+CONTEXT_MIN_SNIPPET_TOKENS = int(os.getenv("CONTEXT_MIN_SNIPPET_TOKENS", "40"))
+# "ids": the model returns the snippet numbers it cited and the server attaches
+# source/page/snippet; "copy": the model copies snippet text into citations.
+CITE_MODE = os.getenv("CITE_MODE", "ids").lower()
+# BACKEND=embedded runs ingest and /query in one process with no network:
+# Qdrant in local (on-disk) mode plus the offline model stand-ins in
+# clients.local_models. Each piece can also be switched on its own.
+BACKEND = os.getenv("BACKEND", "server").lower()
+QDRANT_PATH = os.getenv("QDRANT_PATH", os.path.join(DATA_DIR, "qdrant_local") if BACKEND == "embedded" else "")
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "hash" if BACKEND == "embedded" else "openai").lower()
+CHAT_PROVIDER = os.getenv("CHAT_PROVIDER", "canned" if BACKEND == "embedded" else "openai").lower()
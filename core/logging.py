@@ -1,5 +1,21 @@
-import logging, sys, uuid
+import contextvars, logging, sys, uuid
+
+# The current request's id; set by core.trace.RequestTracing, "-" outside a request
+req_id_var = contextvars.ContextVar("req_id", default="-")
+
+
+class ReqIdFilter(logging.Filter):
+    """Stamps each record with req_id so the format string works for every logger."""
+
+    def filter(self, record):
+        if not hasattr(record, "req_id"):
+            record.req_id = req_id_var.get()
+        return True
+
+
 logging.basicConfig(stream=sys.stdout, level=logging.INFO,
                     format="%(asctime)s %(levelname)s req_id=%(req_id)s %(message)s")
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(ReqIdFilter())
 
 def new_req_id(): return uuid.uuid4().hex[:12]
@@ -0,0 +1,116 @@
+import bisect, threading
+
+# Prometheus text exposition (format 0.0.4) without the client library: a few
+# counters and histograms, each update one dict lookup under a lock, so the
+# instrumentation can stay on in production.
+
+# Seconds; covers a sub-millisecond decision up to a slow LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += self._samples(items)
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, items):
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += value
+
+    def _samples(self, items):
+        out = []
+        for key, (counts, total) in items:
+            running = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="%s"' % ("+Inf" if le == float("inf") else repr(le))
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {running}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {running}")
+        return out
+
+
+class Collected(_Metric):
+    """Values read from elsewhere at scrape time: `fn()` returns {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, type: str, fn, labels=()):
+        super().__init__(name, help, labels)
+        self.type, self.fn = type, fn
+
+    def render(self) -> list[str]:
+        items = sorted((tuple(map(str, k)), v) for k, v in self.fn().items())
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + [
+            f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+def render() -> str:
+    return "\n".join(line for m in _registry for line in m.render()) + "\n"
+
+
+STAGE_SECONDS = Histogram("legal_stage_seconds", "Time spent per pipeline stage.", ("pipeline", "stage"))
+STAGE_ERRORS = Counter("legal_stage_errors_total", "Exceptions raised inside a stage.",
+                       ("pipeline", "stage", "error"))
+REQUESTS = Counter("legal_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("legal_http_request_seconds", "HTTP request duration, to the last body byte.",
+                            ("method", "route"))
+TOKENS = Counter("legal_tokens_total", "Tokens by kind (prompt, context, completion, citation_saved).", ("kind",))
+ITEMS = Counter("legal_stage_items_total", "Items a stage processed (pages, chunks, queries).",
+                ("pipeline", "stage"))
@@ -0,0 +1,17 @@
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its BPE file can't be fetched
+    _enc = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-ish estimate: ~4 ASCII chars per token, ~1 token per non-ASCII char (Indic scripts)."""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars))
+
+
+def count_tokens(text: str) -> int:
+    if _enc is not None:
+        return len(_enc.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
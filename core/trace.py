@@ -0,0 +1,80 @@
+import logging, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from core.logging import req_id_var, new_req_id
+from core.metrics import STAGE_SECONDS, STAGE_ERRORS, ITEMS, REQUESTS, REQUEST_SECONDS
+
+log = logging.getLogger("trace")
+
+# (stage, seconds) spans of the current request; None outside one
+_spans = ContextVar("spans", default=None)
+
+
+def record(pipeline: str, stage: str, seconds: float, items: int = 1):
+    """A stage duration measured elsewhere (e.g. in an extract worker process)."""
+    STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+    ITEMS.inc(items, pipeline=pipeline, stage=stage)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(pipeline: str, stage: str, items: int = 1):
+    """Time the block into the stage histogram and the request's trace; count its exceptions."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(pipeline=pipeline, stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        record(pipeline, stage, time.perf_counter() - t0, items)
+
+
+def _summary(spans: list) -> str:
+    total = {}
+    for stage, secs in spans:
+        total[stage] = total.get(stage, 0.0) + secs
+    return " ".join(f"{stage}={secs * 1000:.1f}ms" for stage, secs in total.items())
+
+
+class RequestTracing:
+    """
+    ASGI middleware: gives each HTTP request an id (X-Request-ID in, or a new
+    one; echoed on the response) that every log line carries, collects the
+    request's spans, and records request count/latency by route template.
+    Timing runs to the last body byte, so streamed responses count in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or new_req_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        rid_token, spans_token = req_id_var.set(rid), _spans.set([])
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            secs = time.perf_counter() - t0
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUESTS.inc(method=scope["method"], route=route, status=status)
+            REQUEST_SECONDS.observe(secs, method=scope["method"], route=route)
+            spans = _spans.get()
+            if spans:
+                log.info("%s %s %s %.1fms %s", scope["method"], route, status, secs * 1000, _summary(spans))
+            req_id_var.reset(rid_token)
+            _spans.reset(spans_token)
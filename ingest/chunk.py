@@ -1,5 +1,5 @@
 import re
-from langdetect import detect
+from ingest.lang import detect_langs
 
 SENT_SPLIT = re.compile(r'(?<=[.?!])\s+')
 
@@ -22,13 +22,7 @@ def chunk_page(doc_name, page, text, target_tokens=450, overlap_sentences=1):
         chunks.append(" ".join(cur))
 
     out = []
-    for idx, c in enumerate(chunks):
-        lang = "en"
-        try: 
-            lang = detect(c)
-        except: 
-            pass
-
+    for idx, (c, lang) in enumerate(zip(chunks, detect_langs(chunks))):
         out.append({
             "doc_name": doc_name,
             "page": page,
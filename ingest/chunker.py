@@ -0,0 +1,155 @@
+import re
+from collections import deque
+from core.tokens import count_tokens
+from ingest.chunk import guess_corpus
+from ingest.lang import detect_langs
+
+# Candidate sentence ends: terminal punctuation (incl. the Devanagari danda)
+# plus trailing quotes/brackets and whitespace, or a blank line.
+BOUNDARY = re.compile(r'[.?!।]+["\'”’)\]]*\s+|\n\s*\n')
+WORD = re.compile(r'\S+')
+HEADING_NO = re.compile(r'\d+[a-z]?')
+
+# Abbreviations common in Indian statutes and judgments; a period after one
+# of these does not end a sentence.
+ABBREVIATIONS = frozenset("""
+sec secs s ss art arts cl cls r rr o ord para paras sub subs sch ch no nos
+v vs viz ibid i.e e.g cf p pp vol ed supp crl cri cr.p.c i.p.c anr ors
+govt ltd pvt co corp inc dr mr mrs ms smt shri sri hon hon'ble j jj cj
+st rs u/s approx illus expl
+""".split())
+
+
+def _is_boundary(text: str, seg_start: int, m) -> bool:
+    punct = m.group()[0]
+    if punct not in ".?!।":
+        return True  # blank line
+    nxt = text[m.end():m.end() + 1]
+    if nxt and nxt.islower():
+        return False
+    if punct != ".":
+        return True
+    # Word before the period, found by scanning back (keeps splitting linear)
+    ws = max(text.rfind(" ", seg_start, m.start()), text.rfind("\n", seg_start, m.start()),
+             text.rfind("\t", seg_start, m.start()), seg_start - 1)
+    word = text[ws + 1:m.start()].lstrip("([\"'").lower()
+    if not word:
+        return True
+    if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+        return False
+    # "125. Order for maintenance ..." — a heading number at the start of a line
+    if HEADING_NO.fullmatch(word):
+        before = text[seg_start:ws + 1]
+        if not before.strip() or before.rstrip(" \t").endswith("\n"):
+            return False
+    return True
+
+
+def split_sentences(text: str) -> list[tuple[int, int]]:
+    """Return (start, end) character spans of the sentences in `text`."""
+    spans, start = [], 0
+    for m in BOUNDARY.finditer(text):
+        if m.start() < start or not _is_boundary(text, start, m):
+            continue
+        end = m.start() + len(m.group().rstrip())
+        if text[start:end].strip():
+            spans.append((start, end))
+        start = m.end()
+    if text[start:].strip():
+        spans.append((start, len(text.rstrip())))
+    return spans
+
+
+class Chunker:
+    """
+    Sentence-packing chunker fed one page at a time.
+
+    Tokens are counted with the embedding tokenizer (core.tokens) once per
+    sentence and kept as a running total, so packing is linear in the text.
+    With cross_page=True a chunk may continue onto the next page; every chunk
+    records its start/end page and character offsets within those pages.
+    """
+
+    def __init__(self, doc_name: str, target_tokens: int = 450,
+                 overlap_sentences: int = 1, cross_page: bool = False):
+        self.doc_name = doc_name
+        self.target = target_tokens
+        self.overlap = overlap_sentences
+        self.cross_page = cross_page
+        self.cur = deque()      # (text, tokens, page, start, end)
+        self.cur_tokens = 0
+        self.index = 0
+
+    def _sentences(self, page: int, text: str):
+        for s, e in split_sentences(text):
+            # Trim to the sentence's visible text so offsets point at it
+            while s < e and text[s].isspace():
+                s += 1
+            sent = text[s:e]
+            n = count_tokens(sent)
+            if n <= self.target:
+                yield sent, n, page, s, e
+                continue
+            # No usable punctuation (OCR output, tables): hard-split on words
+            words = list(WORD.finditer(sent))
+            per = max(1, len(words) * self.target // n)
+            for i in range(0, len(words), per):
+                a, b = words[i].start(), words[min(i + per, len(words)) - 1].end()
+                yield sent[a:b], count_tokens(sent[a:b]), page, s + a, s + b
+
+    def _emit(self) -> dict:
+        first, last = self.cur[0], self.cur[-1]
+        chunk = {
+            "doc_name": self.doc_name,
+            "page": first[2],
+            "page_end": last[2],
+            "char_start": first[3],
+            "char_end": last[4],
+            "chunk_index": self.index,
+            "chunk_id": f"{self.doc_name}:{first[2]}:{self.index:03d}",
+            "text": " ".join(x[0] for x in self.cur),
+            "tokens": self.cur_tokens,
+        }
+        self.index += 1
+        return chunk
+
+    def _flush(self, keep_overlap: bool) -> list[dict]:
+        if not self.cur:
+            return []
+        out = [self._emit()]
+        keep = self.overlap if keep_overlap else 0
+        while len(self.cur) > keep:
+            self.cur_tokens -= self.cur.popleft()[1]
+        return out
+
+    def _finalize(self, chunks: list[dict]) -> list[dict]:
+        for c, lang in zip(chunks, detect_langs([c["text"] for c in chunks])):
+            c["corpus"] = guess_corpus(self.doc_name, c["text"])
+            c["lang_detected"] = lang
+        return chunks
+
+    def feed(self, page: int, text: str) -> list[dict]:
+        out = []
+        for sent in self._sentences(page, text):
+            if self.cur and self.cur_tokens + sent[1] > self.target:
+                out += self._flush(keep_overlap=True)
+                # Drop the overlap too if it alone would push this chunk past the target
+                while self.cur and self.cur_tokens + sent[1] > self.target:
+                    self.cur_tokens -= self.cur.popleft()[1]
+            self.cur.append(sent)
+            self.cur_tokens += sent[1]
+        if not self.cross_page:
+            out += self._flush(keep_overlap=False)
+            self.index = 0
+        return self._finalize(out)
+
+    def finish(self) -> list[dict]:
+        return self._finalize(self._flush(keep_overlap=False))
+
+
+def chunk_pages(doc_name, pages, target_tokens=450, overlap_sentences=1, cross_page=True):
+    """Chunk an iterable of (page, text); yields chunks as soon as they are complete."""
+    ch = Chunker(doc_name, target_tokens, overlap_sentences, cross_page)
+    for page, text in pages:
+        yield from ch.feed(page, text)
+    yield from ch.finish()
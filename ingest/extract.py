@@ -1,12 +1,20 @@
-import fitz, pdfplumber, pytesseract, re, os, io, shutil
+import fitz, pdfplumber, pytesseract, re, os, io, shutil, time, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from PIL import Image
 from docx import Document
 from pathlib import Path
-from core.config import LANGS_OCR
+from core.config import (LANGS_OCR, EXTRACT_WORKERS, OCR_CACHE, OCR_CACHE_PATH,
+                         OCR_ADAPTIVE, OCR_DPI_LOW, OCR_MIN_CONF)
+from ingest.ocr_cache import ocr_cache, page_key
 from langdetect import detect
 import uuid
 
+OCR_MIN_CHARS = 20
+OCR_DPI = 300
+
 # In-memory byte-based extraction functions (Windows-safe)
+@lru_cache(maxsize=1)
 def _tesseract_ok():
     return shutil.which("tesseract") is not None
 
@@ -14,18 +22,159 @@ def _pm_to_pil(pix):
     mode = "RGBA" if pix.alpha else "RGB"
     return Image.frombytes(mode, [pix.width, pix.height], pix.samples)
 
-def extract_text_pdf_bytes(data: bytes) -> list[tuple[int, str]]:
+def _data_to_text(d: dict) -> str:
+    """Rebuild image_to_string-style text from image_to_data word boxes."""
+    lines, last = [], None
+    for i, word in enumerate(d["text"]):
+        if not word.strip():
+            continue
+        key = (d["block_num"][i], d["par_num"][i], d["line_num"][i])
+        if key != last:
+            if last is not None and key[:2] != last[:2]:
+                lines.append("")
+            lines.append(word)
+            last = key
+        else:
+            lines[-1] += " " + word
+    return "\n".join(lines)
+
+def _ocr(page, dpi: int) -> tuple[str, float]:
+    """OCR the page at `dpi`; returns (text, mean word confidence)."""
+    img = _pm_to_pil(page.get_pixmap(dpi=dpi))
+    d = pytesseract.image_to_data(img, lang=LANGS_OCR, output_type=pytesseract.Output.DICT)
+    confs = [float(c) for c, w in zip(d["conf"], d["text"]) if w.strip() and float(c) >= 0]
+    return _data_to_text(d), (sum(confs) / len(confs) if confs else 0.0)
+
+def _dpi_ok(dpi: int | None, conf: float | None) -> bool:
+    """Whether cached OCR done at `dpi` is as good as the current policy would produce."""
+    if dpi is not None and dpi >= OCR_DPI:
+        return True
+    # A low-DPI read only stands if adaptive mode would also have stopped there
+    return (OCR_ADAPTIVE and dpi is not None and conf is not None
+            and dpi >= OCR_DPI_LOW and conf >= OCR_MIN_CONF)
+
+def _ocr_page(page, info: dict) -> str:
+    cache = ocr_cache(OCR_CACHE_PATH) if OCR_CACHE else None
+    key = page_key(page, LANGS_OCR) if cache else None
+    if cache:
+        hit = cache.get(key)
+        if hit and _dpi_ok(hit[2], hit[3]):
+            info.update(source="ocr_cache", saved_ms=round(hit[1], 2))
+            return hit[0]
+
+    t0 = time.perf_counter()
+    if OCR_ADAPTIVE:
+        # Try a cheap render first; only pay for 300 DPI when Tesseract is unsure
+        dpi = OCR_DPI_LOW
+        text, conf = _ocr(page, dpi)
+        if conf < OCR_MIN_CONF:
+            dpi = OCR_DPI
+            text, conf = _ocr(page, dpi)
+        info.update(dpi=dpi, conf=round(conf, 1))
+    else:
+        dpi, conf = OCR_DPI, None
+        text = pytesseract.image_to_string(_pm_to_pil(page.get_pixmap(dpi=dpi)), lang=LANGS_OCR)
+    if cache:
+        cache.put(key, text, (time.perf_counter() - t0) * 1000, dpi, conf)
+    info["source"] = "ocr"
+    return text
+
+def _extract_page(page, info: dict) -> str:
+    """Return the page text; info["source"] records "text", "ocr" or "ocr_cache"."""
+    t = page.get_text("text") or ""
+    if len(t.strip()) < OCR_MIN_CHARS and _tesseract_ok():
+        return _ocr_page(page, info)
+    info["source"] = "text"
+    return t
+
+def _extract_range(doc, start: int, stop: int) -> list[tuple]:
+    rows = []
+    for i in range(start, stop):
+        t0 = time.perf_counter()
+        info = {"page": i + 1}
+        text = _extract_page(doc.load_page(i), info)
+        info["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        rows.append((i + 1, text, info))
+    return rows
+
+# Worker-process state: every worker opens the shared PDF bytes once and then
+# serves page ranges from its own document handle.
+_worker_doc = None
+
+def _init_worker(data: bytes):
+    global _worker_doc
+    _worker_doc = fitz.open(stream=data, filetype="pdf")
+
+def _extract_range_worker(bounds: tuple[int, int]) -> list[tuple]:
+    return _extract_range(_worker_doc, *bounds)
+
+def _page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    # A few ranges per worker so one slow (OCR-heavy) range doesn't stall the pool
+    size = max(1, -(-page_count // (workers * 4)))
+    return [(s, min(s + size, page_count)) for s in range(0, page_count, size)]
+
+# Extraction runs inside a threaded server (pipeline stages, job sweeper, HTTP and
+# SQLite clients), and a forked child of a multithreaded process can deadlock on a
+# lock some other thread held. Workers come from a clean forkserver process instead
+# (spawn where there is none), with this module already imported there.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _MP = multiprocessing.get_context("forkserver")
+    _MP.set_forkserver_preload([__name__])
+else:
+    _MP = multiprocessing.get_context("spawn")
+
+def _iter_rows(data: bytes, workers: int):
     doc = fitz.open(stream=data, filetype="pdf")
-    out = []
-    for i in range(doc.page_count):
-        page = doc.load_page(i)
-        t = page.get_text("text") or ""
-        if len(t.strip()) < 20 and _tesseract_ok():
-            pix = page.get_pixmap(dpi=300)
-            img = _pm_to_pil(pix)
-            t = pytesseract.image_to_string(img, lang=LANGS_OCR)
-        out.append((i+1, t))
-    return out
+    n = doc.page_count
+    if workers > 1 and n > 1:
+        doc.close()
+        ranges = _page_ranges(n, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=_MP,
+                                 initializer=_init_worker, initargs=(data,)) as pool:
+            for part in pool.map(_extract_range_worker, ranges):
+                yield from part
+    else:
+        try:
+            for i in range(n):
+                yield from _extract_range(doc, i, i + 1)
+        finally:
+            doc.close()
+
+def iter_text_pdf_bytes(data: bytes, workers: int | None = None,
+                        timings: list | None = None):
+    """
+    Yield (page, text) pairs in page order, OCR-ing pages without a usable
+    text layer.
+
+    With workers > 1 page ranges are spread over a process pool. If `timings`
+    is given, one {page, source, ms, ...} dict per page is appended to it.
+    """
+    workers = EXTRACT_WORKERS if workers is None else workers
+    for p, t, info in _iter_rows(data, workers):
+        if timings is not None:
+            timings.append(info)
+        yield p, t
+
+def extract_text_pdf_bytes(data: bytes, workers: int | None = None,
+                           timings: list | None = None) -> list[tuple[int, str]]:
+    return list(iter_text_pdf_bytes(data, workers, timings))
+
+def summarize_timings(timings: list[dict]) -> dict:
+    ocr = [t["ms"] for t in timings if t["source"] == "ocr"]
+    text = [t["ms"] for t in timings if t["source"] == "text"]
+    cached = [t for t in timings if t["source"] == "ocr_cache"]
+    scanned = len(ocr) + len(cached)
+    return {
+        "pages": len(timings),
+        "ocr_pages": len(ocr),
+        "ocr_ms": round(sum(ocr), 1),
+        "text_ms": round(sum(text), 1),
+        "max_page_ms": round(max((t["ms"] for t in timings), default=0.0), 1),
+        "ocr_cache_hits": len(cached),
+        "ocr_cache_hit_rate": round(len(cached) / scanned, 4) if scanned else 0.0,
+        "ocr_saved_ms": round(sum(t["saved_ms"] - t["ms"] for t in cached), 1),
+        "ocr_rerendered": sum(1 for t in timings if t.get("dpi") == OCR_DPI),
+    }
 
 def extract_text_docx_bytes(data: bytes) -> list[tuple[int, str]]:
     doc = Document(io.BytesIO(data))
@@ -1,33 +1,154 @@
 from clients.qdrant_client import qdrant, ensure_collection, COLLECTION
 from clients.openai_client import embed_texts
-from qdrant_client.models import PointStruct
+from retrieve.lexical import lexical
+from retrieve.sections import section_index, doc_sections
+from core.config import LEXICAL
+from ingest.manifest import page_sha
+from qdrant_client.models import (PointStruct, Filter, FieldCondition, MatchValue,
+                                  MatchAny, FilterSelector)
+import hashlib
 import uuid
 
+# Chunks handed to embed_texts at a time; the embedding scheduler splits them
+# into token-budgeted requests and runs those concurrently.
+BATCH = 256
 
-def index_chunks(chunks: list[dict]):
-    """Embed and index document chunks into Qdrant with safe UUID IDs."""
+# Namespace for content-addressed point IDs; changing it re-keys the whole collection
+CHUNK_NS = uuid.UUID("6f1c2a8e-3b7d-5e4f-9a10-2c4b6d8e0f13")
+
+
+def doc_sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_point_id(doc_id: str, page: int, page_hash: str, text: str) -> str:
+    """
+    Deterministic point ID: the same document, page content and chunk text
+    always map to the same point. Keyed on the page hash rather than the whole
+    file so an amendment leaves the IDs of untouched pages alone.
+    """
+    return str(uuid.uuid5(CHUNK_NS, f"{doc_id}:{page}:{page_hash}:{text}"))
+
+
+def existing_ids(client, ids: list[str]) -> set[str]:
+    """Return the subset of `ids` already stored in the collection (one bulk lookup)."""
+    if not ids:
+        return set()
+    found = client.retrieve(collection_name=COLLECTION, ids=ids,
+                            with_payload=False, with_vectors=False)
+    return {str(p.id) for p in found}
+
+
+def new_chunks(client, chunks: list[dict]) -> list[dict]:
+    """Drop chunks whose point already exists (or repeats within the batch) so they are never re-embedded."""
+    unique = {}
+    for c in chunks:
+        unique.setdefault(c["chunk_id"], c)  # the first occurrence owns the point
+    have = existing_ids(client, list(unique))
+    return [c for cid, c in unique.items() if cid not in have]
+
+
+def delete_stale_pages(client, doc_name: str, pages: list[int], doc_hash: str):
+    """
+    One bulk delete of a document's points on `pages` that belong to an older
+    version (doc_sha differs), so it is safe to run after the new version's
+    points for those pages were upserted.
+    """
+    if not pages:
+        return
+    flt = Filter(
+        must=[FieldCondition(key="doc_name", match=MatchValue(value=doc_name)),
+              FieldCondition(key="page", match=MatchAny(any=sorted(pages)))],
+        must_not=[FieldCondition(key="doc_sha", match=MatchValue(value=doc_hash))],
+    )
+    client.delete(collection_name=COLLECTION, points_selector=FilterSelector(filter=flt))
+    if LEXICAL:
+        lexical().delete_stale(doc_name, pages, doc_hash)
+
+
+def refresh_doc_sha(client, ids: list[str], doc_hash: str):
+    """Re-stamp reused points with the current version's doc_sha so stale-page deletes keep them."""
+    if ids:
+        client.set_payload(collection_name=COLLECTION, payload={"doc_sha": doc_hash}, points=ids)
+        if LEXICAL:
+            lexical().refresh_doc_sha(ids, doc_hash)
+
+
+def doc_chunks(client, doc_name: str, batch: int = 1024) -> list[dict]:
+    """All stored chunk payloads of one document (payloads only, no vectors)."""
+    flt = Filter(must=[FieldCondition(key="doc_name", match=MatchValue(value=doc_name))])
+    out, offset = [], None
+    while True:
+        points, offset = client.scroll(collection_name=COLLECTION, scroll_filter=flt, limit=batch,
+                                       offset=offset, with_payload=True, with_vectors=False)
+        out += [{**p.payload, "chunk_id": str(p.id)} for p in points]
+        if offset is None:
+            return out
+
+
+def index_sections(client, doc_name: str) -> int:
+    """Rebuild the document's provision -> chunk map from what is now live. Returns the provisions found."""
+    corpus, rows = doc_sections(doc_chunks(client, doc_name))
+    section_index().replace_doc(doc_name, corpus, rows)
+    return len(rows)
+
+
+def upsert_chunks(client, chunks: list[dict], vecs: list[list[float]]):
+    """Upsert already-embedded chunks under their content-addressed chunk_id."""
+    points = [
+        PointStruct(id=c["chunk_id"], vector=v, payload=c)
+        for c, v in zip(chunks, vecs)
+    ]
+    client.upsert(collection_name=COLLECTION, points=points)
+    if LEXICAL:
+        lexical().add(chunks)
+
+
+def index_lexical(chunks: list[dict]):
+    """Add chunks that were already in Qdrant to the lexical index (no-op for ones it has)."""
+    if LEXICAL and chunks:
+        lexical().add(chunks)
+
+
+def _with_point_ids(chunks: list[dict]) -> list[dict]:
+    """
+    Copies of `chunks` keyed by chunk_point_id. Callers like chunk_page emit
+    readable "doc:page:idx" IDs, which Qdrant does not accept; those are kept
+    as chunk_key. Without the page text, a page is hashed from its chunks.
+    """
+    pages = {}
+    for c in chunks:
+        pages.setdefault((c["doc_name"], c["page"]), []).append(c["text"])
+    hashes = {k: page_sha("\n".join(texts)) for k, texts in pages.items()}
+
+    out = []
+    for c in chunks:
+        try:
+            uuid.UUID(str(c["chunk_id"]))
+            out.append(c)
+        except ValueError:
+            h = hashes[(c["doc_name"], c["page"])]
+            out.append({**c, "chunk_key": c["chunk_id"],
+                        "chunk_id": chunk_point_id(c["doc_name"], c["page"], h, c["text"])})
+    return out
+
+
+def index_chunks(chunks: list[dict]) -> int:
+    """Embed and index document chunks into Qdrant, skipping ones already indexed. Returns the number embedded."""
     client = qdrant()
     ensure_collection(client)
+    chunks = _with_point_ids(chunks)
 
-    BATCH = 64
+    embedded = 0
     for i in range(0, len(chunks), BATCH):
-        batch = chunks[i:i+BATCH]
+        batch = new_chunks(client, chunks[i:i+BATCH])
+        if not batch:
+            continue
 
         # Embed texts for the batch
         vecs = embed_texts([c["text"] for c in batch])
 
-        # Assign UUIDs as IDs, keep original chunk_id in payload
-        points = [
-            PointStruct(
-                id=str(uuid.uuid4()),   # ✅ safe unique UUID
-                vector=v,
-                payload={
-                    **c,
-                    "original_chunk_id": c.get("chunk_id")  # keep original for traceability
-                }
-            )
-            for c, v in zip(batch, vecs)
-        ]
-
         # Upsert to Qdrant
-        client.upsert(collection_name=COLLECTION, points=points)
+        upsert_chunks(client, batch, vecs)
+        embedded += len(batch)
+    return embedded
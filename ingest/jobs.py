@@ -0,0 +1,192 @@
+import contextvars, json, os, shutil, socket, sqlite3, threading, time, traceback, uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from core.config import JOBS_DIR, INGEST_JOB_WORKERS
+from ingest.pipeline import run_ingest
+
+# A running job refreshes `updated` at least this often; anything older was
+# orphaned by a dead process and gets picked up again. Every process sweeps
+# for such jobs periodically, not just at startup.
+HEARTBEAT_S = 15
+STALE_S = 120
+SWEEP_S = 30
+
+
+class JobStore:
+    """
+    Ingest jobs persisted in SQLite, with their uploads spooled to JOBS_DIR so
+    a restarted process can resume them. Point IDs are content-addressed, so
+    re-running a half-finished file only embeds what is still missing.
+    """
+
+    def __init__(self, root: str = JOBS_DIR, workers: int = INGEST_JOB_WORKERS):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # host:pid:nonce; the nonce tells a restarted process that reuses a pid
+        # (PID 1 in a container) apart from the one that died
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._sweeper = None
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.root / "jobs.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY, status TEXT NOT NULL, owner TEXT,
+            created REAL NOT NULL, updated REAL NOT NULL,
+            files TEXT NOT NULL, errors TEXT NOT NULL)""")
+        self._db.commit()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-job")
+
+    # -- persistence ---------------------------------------------------------
+
+    def _exec(self, sql, args=()):
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            self._db.commit()
+            return cur
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT id, status, created, updated, files, errors "
+                                   "FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if not row:
+            return None
+        files = json.loads(row[4])
+        return {
+            "job_id": row[0], "status": row[1], "created": row[2], "updated": row[3],
+            "chunks_indexed": sum(f.get("indexed", 0) for f in files),
+            "files": files, "errors": json.loads(row[5]),
+        }
+
+    def _save_file(self, job_id: str, index: int, progress: dict):
+        # Stage threads report concurrently; hold the lock across read-modify-write.
+        # Keyed by upload index: one job may carry two files with the same name.
+        with self._lock:
+            files = self.get(job_id)["files"]
+            files[index] = progress
+            self._exec("UPDATE jobs SET files=?, updated=? WHERE id=?",
+                       (json.dumps(files), time.time(), job_id))
+
+    def _claim(self, job_id: str) -> bool:
+        cur = self._exec("UPDATE jobs SET status='running', owner=?, updated=? "
+                         "WHERE id=? AND status='queued'", (self.owner, time.time(), job_id))
+        return cur.rowcount == 1
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def submit(self, uploads) -> str:
+        """Spool (file_name, file_obj) uploads to disk, record the job and queue it."""
+        job_id = uuid.uuid4().hex
+        job_dir = self.root / job_id
+        job_dir.mkdir(parents=True)
+        files = []
+        for i, (name, fh) in enumerate(uploads):
+            with open(job_dir / f"{i:03d}_{name}", "wb") as out:
+                shutil.copyfileobj(fh, out)
+            files.append({"file": name, "status": "queued", "pages": 0, "chunks": 0,
+                          "indexed": 0, "skipped": 0, "error": None})
+        now = time.time()
+        self._exec("INSERT INTO jobs (id, status, owner, created, updated, files, errors) "
+                   "VALUES (?, 'queued', NULL, ?, ?, ?, '[]')", (job_id, now, now, json.dumps(files)))
+        # The job's log lines keep the id of the request that submitted it
+        self._pool.submit(contextvars.copy_context().run, self._run, job_id)
+        return job_id
+
+    def _owner_gone(self, owner: str | None) -> bool:
+        """True if `owner` is provably dead: a process on this host that no longer runs."""
+        if not owner:
+            return True
+        host, pid, *_ = owner.split(":") + [""]
+        if owner == self.owner or host != self.host or not pid.isdigit():
+            return False  # other hosts are judged by their heartbeat alone
+        if int(pid) == os.getpid():
+            return True   # an earlier process with our pid
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _requeue_orphans(self) -> list[str]:
+        """Requeue running jobs whose owner is dead or has stopped heartbeating."""
+        cutoff = time.time() - STALE_S
+        with self._lock:
+            rows = self._db.execute("SELECT id, owner, updated FROM jobs WHERE status='running'").fetchall()
+        ids = []
+        for job_id, owner, updated in rows:
+            if owner != self.owner and (updated < cutoff or self._owner_gone(owner)):
+                # Conditional on the owner we saw, so concurrent sweepers requeue a job once
+                cur = self._exec("UPDATE jobs SET status='queued', owner=NULL "
+                                 "WHERE id=? AND status='running' AND owner IS ?", (job_id, owner))
+                if cur.rowcount:
+                    ids.append(job_id)
+        return ids
+
+    def _sweep(self):
+        while True:
+            time.sleep(SWEEP_S)
+            try:
+                for job_id in self._requeue_orphans():
+                    self._pool.submit(self._run, job_id)
+            except Exception:
+                traceback.print_exc()
+
+    def resume(self):
+        """Requeue jobs orphaned by a previous process, run every queued job and keep sweeping."""
+        self._requeue_orphans()
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE status='queued' ORDER BY created")]
+        for job_id in ids:
+            self._pool.submit(self._run, job_id)
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep, daemon=True, name="ingest-job-sweep")
+            self._sweeper.start()
+        return ids
+
+    def _run(self, job_id: str):
+        if not self._claim(job_id):
+            return
+        job_dir = self.root / job_id
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(HEARTBEAT_S):
+                self._exec("UPDATE jobs SET updated=? WHERE id=?", (time.time(), job_id))
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            files = self.get(job_id)["files"]
+            pending = []
+            for path in job_dir.iterdir():
+                i, name = path.name.split("_", 1)
+                if files[int(i)]["status"] != "done":
+                    pending.append((int(i), name, path))
+            pending.sort()
+            # run_ingest puts same-name uploads through separate runs, in this (upload) order
+            result = run_ingest([(name, path.read_bytes) for _, name, path in pending],
+                                on_progress=lambda j, f: self._save_file(job_id, pending[j][0], f))
+            errors = result["errors"]
+            status = "error" if errors else "done"
+            self._exec("UPDATE jobs SET status=?, errors=?, updated=? WHERE id=?",
+                       (status, json.dumps(errors), time.time(), job_id))
+        except Exception:
+            errors = [{"stage": "job", "traceback": traceback.format_exc()}]
+            self._exec("UPDATE jobs SET status='error', errors=?, updated=? WHERE id=?",
+                       (json.dumps(errors), time.time(), job_id))
+        else:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        finally:
+            done.set()
+
+
+_store = None
+
+def job_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore()
+    return _store
@@ -0,0 +1,57 @@
+import re
+from langdetect import DetectorFactory, detect
+
+# langdetect is randomised unless seeded; fix it so reruns tag chunks identically
+DetectorFactory.seed = 0
+
+DEFAULT_LANG = "en"
+
+# Unicode blocks for the scripts we OCR (LANGS_OCR): eng+hin+tam+tel
+SCRIPTS = {
+    "hi": re.compile(r"[\u0900-\u097F]"),
+    "ta": re.compile(r"[\u0B80-\u0BFF]"),
+    "te": re.compile(r"[\u0C00-\u0C7F]"),
+    "latin": re.compile(r"[A-Za-z]"),
+}
+WORD_RE = re.compile(r"[a-z]+")
+
+# Function words that dominate English statute text
+EN_WORDS = frozenset("""
+the of and to in or any by be shall for is as such with under this that which
+on from may person section act not an it court other than where if made such
+""".split())
+
+DOMINANT_SHARE = 0.6
+EN_WORD_SHARE = 0.08
+
+
+def _fallback(text: str) -> str:
+    try:
+        return detect(text)
+    except Exception:
+        return DEFAULT_LANG
+
+
+def detect_lang(text: str) -> str:
+    """
+    Script ranges first: Devanagari/Tamil/Telugu text is tagged hi/ta/te and
+    Latin text with enough English function words is "en". Only mixed or
+    other-Latin text goes to the (seeded) statistical detector.
+    """
+    counts = {lang: len(rx.findall(text)) for lang, rx in SCRIPTS.items()}
+    letters = sum(counts.values())
+    if not letters:
+        return DEFAULT_LANG
+
+    lang, n = max(counts.items(), key=lambda kv: kv[1])
+    if n / letters >= DOMINANT_SHARE:
+        if lang != "latin":
+            return lang
+        words = WORD_RE.findall(text.lower())
+        if words and sum(w in EN_WORDS for w in words) / len(words) >= EN_WORD_SHARE:
+            return "en"
+    return _fallback(text)
+
+
+def detect_langs(texts: list[str]) -> list[str]:
+    return [detect_lang(t) for t in texts]
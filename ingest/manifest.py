@@ -0,0 +1,69 @@
+import hashlib, json, sqlite3, threading, time
+from pathlib import Path
+from core.config import MANIFEST_PATH
+
+
+def page_sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class Manifest:
+    """
+    Per-document version record: the file hash and a {page: content hash}
+    map from the last successful ingest. Keyed by document identity (the
+    uploaded file name), so a new upload of the same act is diffed page by
+    page against what is already indexed.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                         "doc_sha TEXT NOT NULL, pages TEXT NOT NULL, updated REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.commit()
+
+    def get(self, doc_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT version, doc_sha, pages FROM docs WHERE doc_id=?",
+                                   (doc_id,)).fetchone()
+        if not row:
+            return None
+        return {"version": row[0], "doc_sha": row[1],
+                "pages": {int(p): h for p, h in json.loads(row[2]).items()}}
+
+    def put(self, doc_id: str, doc_sha: str, pages: dict[int, str]) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT version FROM docs WHERE doc_id=?", (doc_id,)).fetchone()
+            version = (row[0] if row else 0) + 1
+            self._db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)",
+                             (doc_id, version, doc_sha, json.dumps(pages), time.time()))
+            self._db.commit()
+        return version
+
+    # The collection generation changes whenever an ingest alters what is
+    # indexed; query-side caches key on it so they never serve stale answers.
+
+    def generation(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key='generation'").fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            self._db.execute("INSERT INTO meta VALUES ('generation', 1) "
+                             "ON CONFLICT(key) DO UPDATE SET value=value+1")
+            self._db.commit()
+            return self._db.execute("SELECT value FROM meta WHERE key='generation'").fetchone()[0]
+
+
+_manifest = None
+
+def manifest() -> Manifest:
+    global _manifest
+    if _manifest is None:
+        _manifest = Manifest()
+    return _manifest
@@ -0,0 +1,55 @@
+import hashlib, os, sqlite3, threading, time
+from pathlib import Path
+
+# Bump when OCR post-processing changes so stale text isn't served
+OCR_VERSION = "1"
+
+
+def page_key(page, langs: str) -> bytes:
+    """
+    Hash of what Tesseract would see: the page's content stream, the raw
+    streams of the images it draws, its size, and the OCR language set.
+    The render DPI is stored with the row instead, so the caller can decide
+    whether a hit is good enough under the current DPI policy.
+    """
+    doc = page.parent
+    h = hashlib.sha256(f"{OCR_VERSION}\0{langs}\0{page.rect}\0{page.rotation}".encode())
+    h.update(page.read_contents() or b"")
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.digest()
+
+
+class OcrCache:
+    """Persistent page-OCR results keyed by page_key(); also remembers how long the OCR took."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS ocr (key BLOB PRIMARY KEY, text TEXT NOT NULL, "
+                         "ocr_ms REAL NOT NULL, dpi INTEGER, conf REAL, created REAL NOT NULL) WITHOUT ROWID")
+        self._db.commit()
+
+    def get(self, key: bytes) -> tuple[str, float, int | None, float | None] | None:
+        """(text, ocr_ms, dpi, conf); conf is None for a fixed-DPI image_to_string pass."""
+        with self._lock:
+            return self._db.execute("SELECT text, ocr_ms, dpi, conf FROM ocr WHERE key=?", (key,)).fetchone()
+
+    def put(self, key: bytes, text: str, ocr_ms: float, dpi: int, conf: float | None):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, text, ocr_ms, dpi, conf, time.time()))
+            self._db.commit()
+
+
+_cache, _cache_pid = None, None
+
+def ocr_cache(path: str) -> OcrCache:
+    """Per-process instance; extraction workers each open their own connection."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        _cache, _cache_pid = OcrCache(path), os.getpid()
+    return _cache
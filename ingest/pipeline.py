@@ -0,0 +1,311 @@
+import contextvars, queue, threading, traceback
+from clients.qdrant_client import qdrant, ensure_collection
+from clients.openai_client import embed_texts, embed_scheduler
+from ingest.extract import (iter_text_pdf_bytes, extract_text_docx_bytes,
+                            extract_text_txt_bytes, summarize_timings)
+from ingest.chunker import Chunker
+from ingest.index import (upsert_chunks, new_chunks, chunk_point_id, doc_sha,
+                          delete_stale_pages, refresh_doc_sha, index_lexical,
+                          index_sections, BATCH)
+from core.config import CHUNK_TARGET_TOKENS, CHUNK_CROSS_PAGE
+from core.trace import span, record
+from ingest.manifest import manifest, page_sha
+
+# Bounded hand-offs between stages: memory stays flat no matter how large the
+# upload is, and a slow stage back-pressures the ones before it.
+QUEUE_SIZE = 8
+
+_DONE = object()
+
+# Extract-timing source -> trace stage
+_PAGE_STAGE = {"text": "extract", "ocr": "ocr", "ocr_cache": "ocr_cache"}
+
+
+class _FileEnd:
+    """Marker that travels behind the last item of a file through every stage."""
+    def __init__(self, name):
+        self.name = name
+
+
+def iter_pages(name: str, data: bytes, timings: list):
+    ext = name.lower().split(".")[-1]
+    if ext == "pdf":
+        return iter_text_pdf_bytes(data, timings=timings)
+    if ext == "docx":
+        return iter(extract_text_docx_bytes(data))
+    if ext == "txt":
+        return iter(extract_text_txt_bytes(data))
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+class IngestRun:
+    """
+    One streaming ingest: extract -> chunk -> embed -> upsert, each stage
+    on its own thread, connected by bounded queues. Chunks whose content-addressed
+    ID is already in the collection are skipped before embedding.
+
+    Documents are versioned by file name: pages whose content hash matches the
+    last ingested version are not chunked or embedded at all, and once a file
+    is fully upserted, points of its changed or removed pages from older
+    versions are deleted in one call and the page manifest is updated.
+
+    With cross_page chunking a chunk can span pages, so a changed document is
+    re-chunked in full instead: unchanged chunks keep their IDs (and are only
+    re-stamped with the new doc_sha), and every older-version point of the
+    document is deleted at the end.
+
+    `sources` is a list of (file_name, read) with distinct names, where read()
+    returns the file bytes; files are read one at a time by the extract stage. `on_progress`
+    (optional) is called with the per-file progress dict on every change.
+    """
+
+    def __init__(self, sources, on_progress=None, cross_page=CHUNK_CROSS_PAGE):
+        self.sources = list(sources)
+        self.on_progress = on_progress
+        self.cross_page = cross_page
+        self.files = {name: {"file": name, "status": "queued", "pages": 0,
+                             "chunks": 0, "indexed": 0, "skipped": 0, "error": None}
+                      for name, _ in self.sources}
+        self.errors = []
+        self.client = None
+        self.versions = {}
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _update(self, name, **fields):
+        f = self.files[name]
+        f.update(fields)
+        if self.on_progress:
+            self.on_progress(dict(f))
+
+    def _fail(self, name, stage):
+        tb = traceback.format_exc()
+        self.errors.append({"file": name, "stage": stage, "traceback": tb})
+        self._update(name, status="error", error=f"{stage} failed")
+
+    # -- stages --------------------------------------------------------------
+
+    def _extract(self, out: queue.Queue):
+        for name, read in self.sources:
+            timings = []
+            try:
+                self._update(name, status="extracting")
+                data = read()
+                sha = doc_sha(data)
+                prev = manifest().get(name)
+                old_pages = prev["pages"] if prev else {}
+                pages, changed = {}, []
+                if prev and prev["doc_sha"] == sha:
+                    pages = old_pages
+                    self.files[name]["pages"] = len(pages)
+                else:
+                    for page, text in iter_pages(name, data, timings):
+                        if timings:
+                            record("ingest", _PAGE_STAGE.get(timings[-1]["source"], "extract"),
+                                   timings[-1]["ms"] / 1000)
+                        ph = pages[page] = page_sha(text)
+                        self.files[name]["pages"] += 1
+                        if old_pages.get(page) == ph and not self.cross_page:
+                            continue
+                        changed.append(page)
+                        out.put((name, sha, page, ph, text))
+                del data
+                removed = [p for p in old_pages if p not in pages]
+                if self.cross_page and changed:
+                    # Every page was re-chunked; report only the real changes
+                    changed = [p for p in changed if old_pages.get(p) != pages[p]]
+                    stale = sorted(set(pages) | set(old_pages))
+                else:
+                    stale = changed + removed
+                self.versions[name] = {"doc_sha": sha, "pages": pages, "stale": stale,
+                                       "prev": prev["version"] if prev else None}
+                self._update(name, status="indexing", pages_changed=len(changed),
+                             pages_removed=len(removed))
+                if timings:
+                    self._update(name, extract={**summarize_timings(timings), "per_page": timings})
+            except Exception:
+                self._fail(name, "extract")
+            out.put(_FileEnd(name))
+        out.put(_DONE)
+
+    def _chunk(self, inp: queue.Queue, out: queue.Queue):
+        # Per open file: its chunker, doc_sha and {page: page hash}
+        open_files = {}
+
+        def emit(name, chunks):
+            _, sha, hashes = open_files[name]
+            for c in chunks:
+                c["doc_sha"] = sha
+                c["chunk_id"] = chunk_point_id(name, c["page"], hashes[c["page"]], c["text"])
+                out.put(c)
+                self.files[name]["chunks"] += 1
+
+        while (item := inp.get()) is not _DONE:
+            if isinstance(item, _FileEnd):
+                if item.name in open_files:
+                    try:
+                        with span("ingest", "chunk"):
+                            chunks = open_files[item.name][0].finish()
+                        emit(item.name, chunks)
+                    except Exception:
+                        self._fail(item.name, "chunk")
+                    del open_files[item.name]
+                out.put(item)
+                continue
+            name, sha, page, ph, text = item
+            try:
+                if name not in open_files:
+                    chunker = Chunker(name, CHUNK_TARGET_TOKENS, cross_page=self.cross_page)
+                    open_files[name] = (chunker, sha, {})
+                open_files[name][2][page] = ph
+                with span("ingest", "chunk"):
+                    chunks = open_files[name][0].feed(page, text)
+                emit(name, chunks)
+            except Exception:
+                self._fail(name, "chunk")
+        out.put(_DONE)
+
+    def _embed(self, inp: queue.Queue, out: queue.Queue):
+        batch = []
+
+        def flush():
+            if not batch:
+                return
+            try:
+                # One embedding per chunk_id: a chunk repeated in the batch is skipped like an indexed one
+                first = {}
+                for c in new_chunks(self.client, batch):
+                    first.setdefault(c["chunk_id"], c)
+                todo = list(first.values())
+                reused = {}
+                for c in batch:
+                    if first.get(c["chunk_id"]) is c:
+                        continue
+                    self.files[c["doc_name"]]["skipped"] += 1
+                    if c["chunk_id"] not in first:
+                        reused.setdefault(c["doc_sha"], []).append(c["chunk_id"])
+                # Backfills the lexical index for points indexed before it existed
+                index_lexical([c for c in batch if c["chunk_id"] not in first])
+                if self.cross_page:
+                    for sha, ids in reused.items():
+                        refresh_doc_sha(self.client, ids, sha)
+                if todo:
+                    with span("ingest", "embed", len(todo)):
+                        vecs = embed_texts([c["text"] for c in todo])
+                    out.put((todo, vecs))
+            except Exception:
+                for name in {c["doc_name"] for c in batch}:
+                    self._fail(name, "embed")
+            batch.clear()
+
+        while (item := inp.get()) is not _DONE:
+            if isinstance(item, _FileEnd):
+                # Flush so the marker never overtakes the file's last chunks
+                flush()
+                out.put(item)
+                continue
+            batch.append(item)
+            if len(batch) >= BATCH:
+                flush()
+        flush()
+        out.put(_DONE)
+
+    def _upsert(self, inp: queue.Queue):
+        while (item := inp.get()) is not _DONE:
+            if isinstance(item, _FileEnd):
+                self._finish(item.name)
+                continue
+            chunks, vecs = item
+            try:
+                with span("ingest", "upsert", len(chunks)):
+                    upsert_chunks(self.client, chunks, vecs)
+            except Exception:
+                for name in {c["doc_name"] for c in chunks}:
+                    self._fail(name, "qdrant_upsert")
+                continue
+            for c in chunks:
+                self.files[c["doc_name"]]["indexed"] += 1
+            for name in {c["doc_name"] for c in chunks}:
+                self._update(name)
+
+    def _finish(self, name):
+        # Only a fully indexed file becomes the new version; a failed one keeps
+        # the old manifest so the next upload diffs against what is live.
+        v = self.versions.get(name)
+        if self.files[name]["status"] == "error" or v is None:
+            return
+        if v["prev"] is not None and not v["stale"]:
+            self._update(name, status="done", version=v["prev"])
+            return
+        try:
+            delete_stale_pages(self.client, name, v["stale"], v["doc_sha"])
+            sections = index_sections(self.client, name)
+            version = manifest().put(name, v["doc_sha"], v["pages"])
+            manifest().bump_generation()
+        except Exception:
+            self._fail(name, "version")
+            return
+        self._update(name, status="done", version=version, sections=sections)
+
+    # -- driver --------------------------------------------------------------
+
+    def run(self) -> dict:
+        self.client = qdrant()
+        ensure_collection(self.client)
+
+        pages_q = queue.Queue(maxsize=QUEUE_SIZE)
+        # Holds single chunks, so leave room for a full embedding batch
+        chunks_q = queue.Queue(maxsize=BATCH * 2)
+        vecs_q = queue.Queue(maxsize=QUEUE_SIZE)
+        # Each stage runs in a copy of the caller's context, so its logs carry the request id
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(fn, *args), daemon=True)
+            for fn, args in [(self._extract, (pages_q,)), (self._chunk, (pages_q, chunks_q)),
+                             (self._embed, (chunks_q, vecs_q)), (self._upsert, (vecs_q,))]
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        return {
+            "files_received": len(self.sources),
+            "chunks_indexed": sum(f["indexed"] for f in self.files.values()),
+            "chunks_skipped": sum(f["skipped"] for f in self.files.values()),
+            "files": list(self.files.values()),
+            "embedding": embed_scheduler.stats(),
+            "errors": self.errors,
+        }
+
+
+def run_ingest(sources, on_progress=None) -> dict:
+    """
+    Ingest `sources` as IngestRun does. A run tracks files by name, so
+    same-name uploads (versions of one document) go through separate runs, in
+    upload order. `on_progress(i, progress)` gets the file's index in `sources`.
+    """
+    sources = list(sources)
+    rounds, seen = [], {}
+    for i, (name, _) in enumerate(sources):
+        k = seen[name] = seen.get(name, -1) + 1
+        if k == len(rounds):
+            rounds.append([])
+        rounds[k].append(i)
+
+    files, errors = [None] * len(sources), []
+    for batch in rounds:
+        index = {sources[i][0]: i for i in batch}
+        progress = (lambda f, index=index: on_progress(index[f["file"]], f)) if on_progress else None
+        result = IngestRun([sources[i] for i in batch], progress).run()
+        for f in result["files"]:
+            files[index[f["file"]]] = f
+        errors += result["errors"]
+
+    return {
+        "files_received": len(sources),
+        "chunks_indexed": sum(f["indexed"] for f in files),
+        "chunks_skipped": sum(f["skipped"] for f in files),
+        "files": files,
+        "embedding": embed_scheduler.stats(),
+        "errors": errors,
+    }
@@ -14,9 +14,10 @@ def looks_like_case(q):
 def decision_agent(query: str):
     q = query.lower()
     m = SEC_RE.search(q) or ART_RE.search(q)
-    code = None; boosts = []
+    code = None; boosts = []; section = None
     if m:
         num = m.group(2)
+        section = num.upper()
         code = normalize_code(m.group(3)) if m.re is SEC_RE else "Constitution"
         if m.re is ART_RE and not code: code = "Constitution"
         if num:
@@ -30,7 +31,7 @@ def decision_agent(query: str):
         elif looks_like_case(q): code = "Judgments"
 
     payload_filter = {"must": [{"key":"corpus","match":{"value": code}}]} if code else None
-    return {"filter": payload_filter, "boosts": boosts, "code": code}
+    return {"filter": payload_filter, "boosts": boosts, "code": code, "section": section}
 
 def rewrite_query(original: str, boosts: list[str]) -> str:
     return (" ".join(boosts) + " || " if boosts else "") + original
@@ -0,0 +1,128 @@
+import json, re, sqlite3, threading
+from collections import namedtuple
+from pathlib import Path
+from core.config import LEXICAL_PATH
+
+# Same shape as the attributes we read off a Qdrant ScoredPoint
+Hit = namedtuple("Hit", "id score payload")
+
+# Marks (M*) are token characters so Devanagari/Tamil/Telugu words are not
+# split at every vowel sign.
+TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+# Too common to help ranking, and OR-ing them in makes FTS5 walk huge posting lists
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how i in is it its of on or that the
+this to under was what when where which who why will with can does do any my
+""".split())
+
+_TERM = re.compile(r'[^\s"]+')
+
+
+def fts_query(text: str) -> str | None:
+    """OR of the query's words, each quoted so FTS5 tokenizes it like the indexed text."""
+    terms, seen = [], set()
+    for t in _TERM.findall(text.lower()):
+        t = t.strip(".,;:!?()[]{}'|")
+        if not t or t in STOPWORDS or t in seen:
+            continue
+        seen.add(t)
+        terms.append(f'"{t}"')
+    return " OR ".join(terms) or None
+
+
+def _where(payload_filter: dict | None) -> tuple[str, list]:
+    """Translate the `must` match conditions of a Qdrant-style filter dict into SQL."""
+    sql, args = [], []
+    for cond in (payload_filter or {}).get("must", []):
+        path, match = f"$.{cond['key']}", cond["match"]
+        if "value" in match:
+            sql.append("json_extract(c.payload, ?) = ?")
+            args += [path, match["value"]]
+        elif "any" in match:
+            sql.append(f"json_extract(c.payload, ?) IN ({','.join('?' * len(match['any']))})")
+            args += [path, *match["any"]]
+    return "".join(f" AND {s}" for s in sql), args
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk text (SQLite FTS5), kept next to the Qdrant
+    collection and written by the same ingest calls. Rows are keyed by the
+    chunk's point ID and keep its payload, so lexical hits can be fused with
+    dense hits without a round trip to Qdrant.
+    """
+
+    def __init__(self, path: str = LEXICAL_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL, doc_name TEXT NOT NULL,
+                page INTEGER NOT NULL, doc_sha TEXT, text TEXT NOT NULL, payload TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_doc ON chunks(doc_name, page);
+            CREATE VIRTUAL TABLE IF NOT EXISTS lex USING fts5(
+                text, content='chunks', content_rowid='id', tokenize="{TOKENIZER}");
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO lex(rowid, text) VALUES (new.id, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO lex(lex, rowid, text) VALUES ('delete', old.id, old.text);
+            END;
+        """)
+        self._db.commit()
+
+    def add(self, chunks: list[dict]):
+        rows = [(c["chunk_id"], c["doc_name"], c["page"], c.get("doc_sha"), c["text"],
+                 json.dumps(c, ensure_ascii=False)) for c in chunks]
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO chunks (chunk_id, doc_name, page, doc_sha, text, payload) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def delete_stale(self, doc_name: str, pages: list[int], doc_hash: str):
+        """Mirror of ingest.index.delete_stale_pages."""
+        if not pages:
+            return
+        marks = ",".join("?" * len(pages))
+        with self._lock:
+            self._db.execute(f"DELETE FROM chunks WHERE doc_name=? AND page IN ({marks}) "
+                             "AND (doc_sha IS NULL OR doc_sha != ?)", (doc_name, *pages, doc_hash))
+            self._db.commit()
+
+    def refresh_doc_sha(self, ids: list[str], doc_hash: str):
+        with self._lock:
+            self._db.executemany("UPDATE chunks SET doc_sha=?, payload=json_set(payload, '$.doc_sha', ?) "
+                                 "WHERE chunk_id=?", [(doc_hash, doc_hash, i) for i in ids])
+            self._db.commit()
+
+    def search(self, text: str, top_k: int = 24, payload_filter: dict | None = None) -> list[Hit]:
+        match = fts_query(text)
+        if not match:
+            return []
+        where, args = _where(payload_filter)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.chunk_id, bm25(lex) AS s, c.payload FROM lex JOIN chunks c ON c.id = lex.rowid "
+                f"WHERE lex MATCH ?{where} ORDER BY s LIMIT ?", (match, *args, top_k)).fetchall()
+        # bm25() is lower-is-better; flip it so scores read like similarities
+        return [Hit(cid, -s, json.loads(p)) for cid, s, p in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def lexical() -> LexicalIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex()
+    return _index
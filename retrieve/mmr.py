@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def _matrix(points) -> np.ndarray:
+    """Row-normalized candidate vectors; a point without a vector gets a zero row (similar to nothing)."""
+    dim = next((len(p.vector) for p in points if getattr(p, "vector", None)), 1)
+    m = np.zeros((len(points), dim), dtype=np.float32)
+    for i, p in enumerate(points):
+        v = getattr(p, "vector", None)
+        if v:
+            m[i] = v
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+
+def select_mmr(points: list, k: int, lambda_: float = 0.7, sim_threshold: float = 0.92,
+               max_per_doc: int = 6, max_per_page: int = 2, pinned: int = 0) -> list:
+    """
+    Maximal marginal relevance over ranked candidates.
+
+    Relevance is the candidate's position in the incoming (already fused)
+    ranking, scaled to 1..0, so lexical-only hits keep the rank fusion gave
+    them. Each step picks the candidate maximizing
+    lambda * relevance - (1 - lambda) * max cosine to what is already picked.
+    Candidates at or above `sim_threshold` to a picked chunk (the overlap
+    sentence between neighbouring chunks makes these common) are dropped, as
+    are ones past the per-document or per-page cap. The first `pinned`
+    points are taken as is, ahead of the selection, and count toward the caps.
+    """
+    if not points:
+        return []
+    n = len(points)
+    vecs = _matrix(points)
+    sims = vecs @ vecs.T
+    rel = 1.0 - np.arange(n, dtype=np.float32) / n
+    docs = [p.payload.get("doc_name") for p in points]
+    pages = [(p.payload.get("doc_name"), p.payload.get("page")) for p in points]
+
+    open_ = np.ones(n, dtype=bool)
+    max_sim = np.zeros(n, dtype=np.float32)
+    per_doc, per_page, picked = {}, {}, []
+
+    def take(i):
+        picked.append(i)
+        open_[i] = False
+        np.maximum(max_sim, sims[i], out=max_sim)
+        per_doc[docs[i]] = per_doc.get(docs[i], 0) + 1
+        per_page[pages[i]] = per_page.get(pages[i], 0) + 1
+
+    for i in range(min(pinned, n, k)):
+        take(i)
+    while len(picked) < k:
+        open_ &= max_sim < sim_threshold
+        for i in np.flatnonzero(open_):
+            if per_doc.get(docs[i], 0) >= max_per_doc or per_page.get(pages[i], 0) >= max_per_page:
+                open_[i] = False
+        if not open_.any():
+            break
+        score = np.where(open_, lambda_ * rel - (1 - lambda_) * max_sim, -np.inf)
+        take(int(np.argmax(score)))
+    return [points[i] for i in picked]
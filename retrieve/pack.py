@@ -1,3 +1,8 @@
+from core.config import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_SNIPPET_TOKENS, CONTEXT_MIN_SNIPPET_TOKENS
+from core.tokens import count_tokens
+from ingest.chunker import split_sentences
+
+
 def build_snippets(points):
     out = []
     for idx, p in enumerate(points, start=1):
@@ -10,3 +15,106 @@ def build_snippets(points):
             "snippet": snippet[:900]
         })
     return out
+
+
+def _sentences(text: str) -> list[str]:
+    return [" ".join(text[s:e].split()) for s, e in split_sentences(text)]
+
+
+def _key(sentence: str) -> str:
+    return " ".join(sentence.split()).casefold()
+
+
+def _trim(sentences: list[str], budget: int) -> tuple[list[str], int]:
+    """Leading sentences that fit in `budget` tokens; cuts inside the first one only if nothing else fits."""
+    out, used = [], 0
+    for s in sentences:
+        n = count_tokens(s)
+        if used + n > budget:
+            if not out:
+                # One over-long run-on sentence (OCR, tables): cut at a word boundary
+                words = s.split()
+                keep = max(1, len(words) * budget // max(n, 1))
+                while keep > 1 and count_tokens(" ".join(words[:keep]) + " …") > budget:
+                    keep = keep * 9 // 10
+                s = " ".join(words[:keep]) + " …"
+                out, used = [s], count_tokens(s)
+            break
+        out.append(s)
+        used += n
+    return out, used
+
+
+def _merge_groups(points) -> list[dict]:
+    """
+    Runs of adjacent chunks from the same document and page become one
+    block, with the overlap sentences the chunker repeats at each seam
+    removed. Blocks keep the rank of their best chunk.
+    """
+    blocks, by_page = [], {}
+    for p in points:
+        pl = p.payload
+        key = (pl["doc_name"], pl.get("page", 1))
+        by_page.setdefault(key, []).append(pl)
+        if len(by_page[key]) == 1:
+            blocks.append(key)
+
+    out = []
+    for key in blocks:
+        chunks = sorted(by_page[key], key=lambda c: (c.get("char_start", 0), c.get("chunk_index", 0)))
+        run, runs = [chunks[0]], []
+        for c in chunks[1:]:
+            prev = run[-1]
+            adjacent = (c.get("chunk_index", -2) == prev.get("chunk_index", -9) + 1
+                        or ("char_start" in c and c["char_start"] <= prev.get("char_end", -1)))
+            if adjacent:
+                run.append(c)
+            else:
+                runs.append(run)
+                run = [c]
+        runs.append(run)
+
+        for run in runs:
+            sents, seen, removed = [], set(), 0
+            for c in run:
+                for s in _sentences(c.get("text", "")):
+                    if _key(s) in seen:
+                        removed += 1
+                        continue
+                    seen.add(_key(s))
+                    sents.append(s)
+            out.append({"source": key[0], "page": key[1], "sentences": sents,
+                        "chunks": len(run), "overlap_removed": removed})
+    return out
+
+
+def pack_context(points, budget: int = CONTEXT_TOKEN_BUDGET,
+                 max_snippet: int = CONTEXT_MAX_SNIPPET_TOKENS,
+                 min_snippet: int = CONTEXT_MIN_SNIPPET_TOKENS) -> tuple[list[dict], dict]:
+    """
+    Pack ranked points into numbered snippets under a prompt-token budget.
+    Blocks are filled in rank order, each trimmed at a sentence boundary to
+    what is left of the budget (and at most `max_snippet` tokens); a block
+    that would get fewer than `min_snippet` tokens is dropped. Returns the
+    snippets (same shape as build_snippets) and token accounting.
+    """
+    snippets, left = [], budget
+    stats = {"budget": budget, "chunks": len(points), "blocks": 0, "overlap_sentences_removed": 0,
+             "trimmed": 0, "dropped": 0, "raw_tokens": 0, "context_tokens": 0}
+    for block in _merge_groups(points):
+        stats["overlap_sentences_removed"] += block["overlap_removed"]
+        full = sum(count_tokens(s) for s in block["sentences"])
+        stats["raw_tokens"] += full
+        room = min(left, max_snippet)
+        if room < min_snippet or not block["sentences"]:
+            stats["dropped"] += 1
+            continue
+        sents, used = _trim(block["sentences"], room)
+        if used < full:
+            stats["trimmed"] += 1
+        left -= used
+        snippets.append({"n": len(snippets) + 1, "source": block["source"], "page": block["page"],
+                         "snippet": " ".join(sents)})
+    stats["blocks"] = len(snippets)
+    stats["context_tokens"] = budget - left
+    return snippets, stats
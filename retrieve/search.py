@@ -1,9 +1,48 @@
-from clients.qdrant_client import qdrant, COLLECTION
-from qdrant_client.models import Filter
+from clients.qdrant_client import qdrant, aqdrant, search_params, COLLECTION
+from qdrant_client.models import Filter, SearchRequest
+from core.config import RRF_K
 
 def search(vec: list[float], top_k=24, payload_filter=None):
     client = qdrant()
     flt = Filter(**payload_filter) if payload_filter else None
     res = client.search(collection_name=COLLECTION, query_vector=vec, with_payload=True,
-                        limit=top_k, query_filter=flt)
+                        limit=top_k, query_filter=flt, search_params=search_params())
     return res
+
+async def asearch(vec: list[float], top_k=24, payload_filter=None, with_vectors=False):
+    flt = Filter(**payload_filter) if payload_filter else None
+    return await aqdrant().search(collection_name=COLLECTION, query_vector=vec, with_payload=True,
+                                  with_vectors=with_vectors, limit=top_k, query_filter=flt,
+                                  search_params=search_params())
+
+async def asearch_batch(vecs: list[list[float]], top_k=24, payload_filters=None, with_vectors=False):
+    """One Qdrant round trip for many searches; results come back in request order."""
+    filters = payload_filters or [None] * len(vecs)
+    requests = [SearchRequest(vector=v, filter=Filter(**f) if f else None, limit=top_k,
+                              with_payload=True, with_vector=with_vectors, params=search_params())
+                for v, f in zip(vecs, filters)]
+    return await aqdrant().search_batch(collection_name=COLLECTION, requests=requests)
+
+async def afetch(ids: list[str], with_vectors=False):
+    """Points by ID, in the order given (no vector search)."""
+    if not ids:
+        return []
+    found = await aqdrant().retrieve(collection_name=COLLECTION, ids=ids, with_payload=True,
+                                     with_vectors=with_vectors)
+    by_id = {str(p.id): p for p in found}
+    return [by_id[i] for i in ids if i in by_id]
+
+def fuse_rrf(rankings: list[list], k: int = RRF_K, top_k: int | None = None) -> list:
+    """
+    Reciprocal rank fusion: each hit scores sum(1 / (k + rank)) over the
+    rankings it appears in. Hits are matched by point id; the first-seen
+    object for an id is kept, so dense hits win over lexical copies.
+    """
+    scores, first = {}, {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = str(hit.id)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            first.setdefault(key, hit)
+    order = sorted(scores, key=scores.get, reverse=True)
+    return [first[key] for key in order[:top_k]]
@@ -0,0 +1,116 @@
+import re, sqlite3, threading, time
+from collections import Counter
+from pathlib import Path
+from core.config import SECTIONS_PATH
+
+# A provision heading in India Code text: "124. Security for unexpired period
+# of bond.—(1) When ...", optionally behind an amendment marker ("1[125. ...").
+# The ".—" after the title is what separates a heading from an arrangement-of-
+# sections line or a cross reference; a wrapped title continues in lower case.
+HEADING = re.compile(
+    r'(?:^|(?<=\s))(?:\d+\[)?(\d{1,3}(?:-?[A-Z]{1,3})?)\.[ \t]+'
+    r'([A-Z“"(](?:[^—–\n]|\n(?=[ \t]*[a-z(]))'r'{0,300}?)\.\s*[—–]'
+)
+
+# Judgments number their paragraphs the same way; they have no provisions
+NOT_STATUTES = frozenset({"Judgments"})
+
+
+def norm_section(num: str) -> str:
+    """"105-I" -> "105I", "498a" -> "498A"."""
+    return num.replace("-", "").upper()
+
+
+def find_headings(text: str) -> list[tuple[str, str]]:
+    return [(norm_section(m.group(1)), " ".join(m.group(2).split())) for m in HEADING.finditer(text)]
+
+
+def doc_sections(chunks: list[dict]) -> tuple[str, list[dict]]:
+    """
+    Walk a document's chunks in reading order and assign each to the
+    provision it falls under (the last heading seen) plus any that start in
+    it. Returns the document's corpus and one row per provision.
+
+    A number can head more than one span (amending schedules, state
+    amendments, footnotes); the longest span by tokens is kept, which is the
+    provision itself rather than the short note about it.
+    """
+    chunks = sorted(chunks, key=lambda c: (c["page"], c.get("char_start", 0), c.get("chunk_index", 0)))
+    corpus = Counter(c.get("corpus") for c in chunks).most_common(1)[0][0] if chunks else None
+    if corpus in NOT_STATUTES:
+        return corpus, []
+
+    spans, cur = [], None
+    for c in chunks:
+        members = [cur] if cur else []
+        for num, title in find_headings(c["text"]):
+            cur = {"section": num, "title": title, "chunks": [], "tokens": 0}
+            spans.append(cur)
+            members.append(cur)
+        for s in members:
+            if not s["chunks"] or s["chunks"][-1] is not c:
+                s["chunks"].append(c)
+                s["tokens"] += c.get("tokens", 0) or len(c["text"]) // 4
+
+    best = {}
+    for s in spans:
+        if s["section"] not in best or s["tokens"] > best[s["section"]]["tokens"]:
+            best[s["section"]] = s
+    return corpus, [{
+        "section": s["section"], "title": s["title"],
+        "chunk_ids": [c["chunk_id"] for c in s["chunks"]],
+        "page": s["chunks"][0]["page"],
+        "page_end": max(c.get("page_end", c["page"]) for c in s["chunks"]),
+    } for s in best.values()]
+
+
+class SectionIndex:
+    """
+    Persistent (corpus, section number) -> chunk IDs and page range, rebuilt
+    per document at the end of its ingest. Lets retrieval fetch a named
+    provision by ID instead of hoping the ANN search surfaces it.
+    """
+
+    def __init__(self, path: str = SECTIONS_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sections (corpus TEXT NOT NULL, section TEXT NOT NULL, "
+                         "doc_name TEXT NOT NULL, title TEXT, chunk_ids TEXT NOT NULL, page INTEGER NOT NULL, "
+                         "page_end INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (corpus, section, doc_name))")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sections_doc ON sections(doc_name)")
+        self._db.commit()
+
+    def replace_doc(self, doc_name: str, corpus: str, rows: list[dict]):
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM sections WHERE doc_name=?", (doc_name,))
+            self._db.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+                (corpus, r["section"], doc_name, r["title"], " ".join(r["chunk_ids"]),
+                 r["page"], r["page_end"], now) for r in rows])
+            self._db.commit()
+
+    def lookup(self, section: str, corpus: str | None = None) -> list[dict]:
+        sql = "SELECT corpus, doc_name, title, chunk_ids, page, page_end FROM sections WHERE section=?"
+        args = [norm_section(section)]
+        if corpus:
+            sql += " AND corpus=?"
+            args.append(corpus)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY updated DESC", args).fetchall()
+        return [{"corpus": r[0], "doc_name": r[1], "title": r[2], "chunk_ids": r[3].split(),
+                 "page": r[4], "page_end": r[5]} for r in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def section_index() -> SectionIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SectionIndex()
+    return _index
@@ -0,0 +1,97 @@
+# scripts/bench_chunker.py
+# Compare ingest.chunk.chunk_page with the ingest.chunker engine on tests/data.
+# Run: python -m scripts.bench_chunker [--no-lang] [--repeat 3] [--target 450]
+import argparse, json, statistics, time
+from pathlib import Path
+
+import fitz
+
+import ingest.chunk as old_chunk
+import ingest.chunker as new_chunker
+from ingest.chunk import chunk_page
+from ingest.chunker import Chunker
+from core.tokens import count_tokens
+
+DATA = Path(__file__).resolve().parent.parent / "tests" / "data"
+
+
+def load_pages():
+    docs = {}
+    for pdf in sorted(DATA.glob("*.pdf")):
+        with fitz.open(pdf) as doc:
+            docs[pdf.name] = [(i + 1, p.get_text("text") or "") for i, p in enumerate(doc)]
+    return docs
+
+
+def run_old(docs, target):
+    return [c for name, pages in docs.items() for page, text in pages
+            for c in chunk_page(name, page, text, target_tokens=target)]
+
+
+def run_new(docs, target, cross_page):
+    out = []
+    for name, pages in docs.items():
+        ch = Chunker(name, target, cross_page=cross_page)
+        for page, text in pages:
+            out += ch.feed(page, text)
+        out += ch.finish()
+    return out
+
+
+def measure(fn, repeat):
+    times, chunks = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), chunks
+
+
+def describe(name, secs, chunks, pages, target):
+    toks = [count_tokens(c["text"]) for c in chunks]
+    return {
+        "engine": name,
+        "seconds": round(secs, 4),
+        "pages_per_s": round(pages / secs, 1) if secs else None,
+        "chunks": len(chunks),
+        "tokens_mean": round(statistics.mean(toks), 1) if toks else 0,
+        "tokens_max": max(toks, default=0),
+        "over_target_pct": round(100 * sum(t > target for t in toks) / len(toks), 2) if toks else 0,
+        "cross_page_chunks": sum(c.get("page_end", c["page"]) != c["page"] for c in chunks),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--target", type=int, default=450)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-lang", action="store_true",
+                    help="stub out language detection to time splitting/packing alone")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    if args.no_lang:
+        old_chunk.detect_langs = lambda texts: ["en"] * len(texts)
+        new_chunker.detect_langs = lambda texts: ["en"] * len(texts)
+
+    docs = load_pages()
+    n_pages = sum(len(p) for p in docs.values())
+    print(f"{len(docs)} documents, {n_pages} pages, target {args.target} tokens")
+
+    results = []
+    for name, fn in [
+        ("chunk_page", lambda: run_old(docs, args.target)),
+        ("chunker/page", lambda: run_new(docs, args.target, cross_page=False)),
+        ("chunker/cross_page", lambda: run_new(docs, args.target, cross_page=True)),
+    ]:
+        secs, chunks = measure(fn, args.repeat)
+        r = describe(name, secs, chunks, n_pages, args.target)
+        results.append(r)
+        print(json.dumps(r))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
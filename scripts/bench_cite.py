@@ -0,0 +1,68 @@
+# scripts/bench_cite.py
+# Output tokens and generation time with citations copied by the model vs hydrated server-side.
+# Needs the configured OpenAI key and an indexed Qdrant collection; retrieval runs once per query.
+# Run: python -m scripts.bench_cite [--repeat 3]
+import argparse, json, statistics, time
+
+from clients.openai_client import embed_texts, chat_json
+from core.config import TOP_K
+from core.tokens import count_tokens
+from retrieve.decision import decision_agent, rewrite_query
+from retrieve.search import search
+from retrieve.pack import pack_context
+from answer.prompt import build_messages
+from answer.validate import parse_or_repair
+from scripts.load_query import QUERIES, pct
+
+
+def snippets_for(q):
+    d = decision_agent(q)
+    vec = embed_texts([rewrite_query(q, d["boosts"])])[0]
+    return pack_context(search(vec, top_k=TOP_K, payload_filter=d["filter"]))[0]
+
+
+def generate(q, snippets, mode):
+    t0 = time.perf_counter()
+    raw = chat_json(build_messages(q, snippets, mode), max_tokens=900)
+    ms = (time.perf_counter() - t0) * 1000
+    data = parse_or_repair(raw, snippets if mode == "ids" else None)
+    return {"ms": ms, "tokens": count_tokens(raw), "citations": len(data.get("citations", []))}
+
+
+def summarize(mode, runs):
+    ms, toks = [r["ms"] for r in runs], [r["tokens"] for r in runs]
+    return {
+        "mode": mode,
+        "runs": len(runs),
+        "completion_tokens_mean": round(statistics.mean(toks), 1),
+        "generate_p50_ms": round(statistics.median(ms), 1),
+        "generate_p95_ms": round(pct(ms, 95), 1),
+        "citations_mean": round(statistics.mean(r["citations"] for r in runs), 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    contexts = [(q, snippets_for(q)) for q in QUERIES]
+    runs = {"copy": [], "ids": []}
+    for _ in range(args.repeat):
+        for q, snippets in contexts:
+            # Alternate the order so neither mode always runs on a warm connection
+            for mode in ("copy", "ids") if len(runs["copy"]) % 2 == 0 else ("ids", "copy"):
+                runs[mode].append(generate(q, snippets, mode))
+
+    results = [summarize(m, r) for m, r in runs.items()]
+    for r in results:
+        print(json.dumps(r))
+    copy, ids = results
+    print(json.dumps({
+        "output_tokens_saved_pct": round(100 * (1 - ids["completion_tokens_mean"] / copy["completion_tokens_mean"]), 1),
+        "p50_ms_saved": round(copy["generate_p50_ms"] - ids["generate_p50_ms"], 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# scripts/bench_lexical.py
+# Build the BM25 index from tests/data in a temp dir and time lexical searches.
+# Run: python -m scripts.bench_lexical [--searches 500]
+import argparse, json, random, statistics, tempfile, time
+from pathlib import Path
+
+from ingest.chunker import chunk_pages
+from retrieve.lexical import LexicalIndex
+from scripts.bench_chunker import load_pages
+
+QUERIES = [
+    "Section 125 BNSS maintenance of wives children and parents",
+    "Section 103 BNS punishment for murder",
+    "Article 21 Constitution protection of life and personal liberty",
+    "theft punishment",
+    "arrest without warrant",
+    "Section 63 BSA admissibility of electronic records",
+]
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--searches", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=24)
+    args = ap.parse_args()
+
+    docs = load_pages()
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LexicalIndex(str(Path(tmp) / "lexical.sqlite"))
+        t0 = time.perf_counter()
+        for name, pages in docs.items():
+            chunks = list(chunk_pages(name, pages, cross_page=False))
+            for i, c in enumerate(chunks):
+                c["chunk_id"] = f"{name}:{i}"
+            index.add(chunks)
+        build_s = time.perf_counter() - t0
+
+        random.seed(0)
+        lat = []
+        for _ in range(args.searches):
+            q = random.choice(QUERIES)
+            t0 = time.perf_counter()
+            index.search(q, args.top_k)
+            lat.append((time.perf_counter() - t0) * 1000)
+
+        top = {q: [(h.payload["doc_name"], h.payload["page"]) for h in index.search(q, 3)] for q in QUERIES}
+        print(json.dumps({
+            "chunks": index.count(),
+            "build_s": round(build_s, 2),
+            "search_p50_ms": round(statistics.median(lat), 3),
+            "search_p95_ms": round(pct(lat, 95), 3),
+        }))
+        for q, hits in top.items():
+            print(json.dumps({"query": q, "top3": hits}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# scripts/bench_pipeline.py
+# Per-stage timings of the ingest and query pipeline over tests/data, with no network:
+# models and Qdrant are the embedded-mode stand-ins (hash embeddings, canned answers,
+# local Qdrant in a temp dir), so the numbers measure our own code.
+# Run: python -m scripts.bench_pipeline [--repeat 3] [--ocr-pages 4] [--json out.json]
+#      [--baseline old.json [--tolerance 0.25] [--min-ms 1]]   # exits 1 if a stage's p50 regressed
+import os, tempfile
+
+# Configuration is read at import time, so the backend is chosen before anything loads it
+_TMP = tempfile.mkdtemp(prefix="bench_pipeline_")
+os.environ.update(BACKEND="embedded", DATA_DIR=_TMP, QDRANT_PATH=os.path.join(_TMP, "qdrant"),
+                  EMBED_PROVIDER="hash", CHAT_PROVIDER="canned")
+
+import argparse, json, platform, resource, shutil, statistics, subprocess, sys, time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import fitz
+
+import ingest.chunk as old_chunk
+from ingest.chunk import chunk_page, guess_corpus
+from ingest.chunker import Chunker
+from ingest.extract import _ocr, _tesseract_ok, OCR_DPI
+from ingest.lang import detect_langs
+from ingest.index import BATCH, chunk_point_id, upsert_chunks
+from ingest.manifest import page_sha
+from clients.openai_client import embed_texts, chat_json
+from clients.qdrant_client import qdrant, ensure_collection
+from core.config import TOP_K, CITE_MODE
+from retrieve.decision import decision_agent, rewrite_query
+from retrieve.search import search
+from retrieve.pack import build_snippets, pack_context
+from answer.prompt import build_messages
+from answer.validate import parse_or_repair
+from report.render import render_html
+from scripts.bench_chunker import DATA
+from scripts.load_query import QUERIES, pct
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+
+
+class Stages:
+    """Wall time per call and items processed, per stage, in first-seen order."""
+
+    def __init__(self):
+        self.calls = defaultdict(list)
+        self.items = defaultdict(int)
+        self.rss = {}
+        self.skipped = {}
+
+    @contextmanager
+    def time(self, name: str, items: int = 1):
+        t0 = time.perf_counter()
+        yield
+        self.calls[name].append(time.perf_counter() - t0)
+        self.items[name] += items
+        self.rss[name] = peak_rss_mb()
+
+    def report(self) -> dict:
+        out = {}
+        for name, secs in self.calls.items():
+            ms = [s * 1000 for s in secs]
+            total = sum(secs)
+            out[name] = {
+                "calls": len(secs),
+                "items": self.items[name],
+                "total_s": round(total, 4),
+                "items_per_s": round(self.items[name] / total, 1) if total else None,
+                "p50_ms": round(statistics.median(ms), 3),
+                "p95_ms": round(pct(ms, 95), 3),
+                "peak_rss_mb": self.rss[name],
+            }
+        out.update({name: {"skipped": why} for name, why in self.skipped.items()})
+        return out
+
+
+def ingest(st: Stages, docs: dict, ocr_pages: int):
+    client = qdrant()
+    ensure_collection(client)
+    for name, data in docs.items():
+        pages = []
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            for i, page in enumerate(doc):
+                with st.time("extract"):
+                    pages.append((i + 1, page.get_text("text") or ""))
+            if not _tesseract_ok():
+                st.skipped["ocr"] = "tesseract not installed"
+            for page in list(doc)[:ocr_pages] if _tesseract_ok() else []:
+                with st.time("ocr"):
+                    _ocr(page, OCR_DPI)
+
+        # chunk_page tags language and corpus itself; time those separately below
+        detect, old_chunk.detect_langs = old_chunk.detect_langs, lambda texts: ["en"] * len(texts)
+        try:
+            for page, text in pages:
+                with st.time("chunk_page"):
+                    chunk_page(name, page, text)
+        finally:
+            old_chunk.detect_langs = detect
+
+        chunks, ch = [], Chunker(name)
+        for page, text in pages:
+            with st.time("chunker"):
+                chunks += ch.feed(page, text)
+        chunks += ch.finish()
+
+        for i in range(0, len(chunks), 64):
+            texts = [c["text"] for c in chunks[i:i + 64]]
+            with st.time("lang_detect", len(texts)):
+                detect_langs(texts)
+        for c in chunks:
+            with st.time("guess_corpus"):
+                guess_corpus(name, c["text"])
+
+        hashes = {page: page_sha(text) for page, text in pages}
+        for c in chunks:
+            c["chunk_id"] = chunk_point_id(name, c["page"], hashes[c["page"]], c["text"])
+        for i in range(0, len(chunks), BATCH):
+            batch = chunks[i:i + BATCH]
+            with st.time("embed_batch", len(batch)):
+                vecs = embed_texts([c["text"] for c in batch])
+            with st.time("upsert", len(batch)):
+                upsert_chunks(client, batch, vecs)
+
+
+def query(st: Stages):
+    for q in QUERIES:
+        with st.time("decision_agent"):
+            d = decision_agent(q)
+        vec = embed_texts([rewrite_query(q, d["boosts"])])[0]
+        with st.time("search"):
+            points = search(vec, top_k=3 * TOP_K, payload_filter=d["filter"])
+        if not points:  # the corpus filter can rule out every test document
+            points = search(vec, top_k=3 * TOP_K)
+        with st.time("build_snippets"):
+            build_snippets(points[:TOP_K])
+        with st.time("pack_context"):
+            snippets, _ = pack_context(points[:TOP_K])
+        with st.time("prompt"):
+            messages = build_messages(q, snippets, CITE_MODE)
+        raw = chat_json(messages)
+        with st.time("parse_answer"):
+            data = parse_or_repair(raw, snippets if CITE_MODE == "ids" else None)
+        with st.time("render_html"):
+            render_html(data)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=DATA.parent.parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def regressions(stages: dict, baseline: dict, tolerance: float, min_ms: float) -> list[dict]:
+    out = []
+    for name, r in stages.items():
+        old = baseline.get("stages", {}).get(name, {})
+        # Sub-millisecond stages are mostly timer noise between runs
+        if "p50_ms" in r and old.get("p50_ms") and max(r["p50_ms"], old["p50_ms"]) >= min_ms:
+            ratio = r["p50_ms"] / old["p50_ms"]
+            if ratio > 1 + tolerance:
+                out.append({"stage": name, "p50_ms": r["p50_ms"], "baseline_p50_ms": old["p50_ms"],
+                            "ratio": round(ratio, 2)})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3, help="query passes over QUERIES")
+    ap.add_argument("--ocr-pages", type=int, default=4, help="pages per document to OCR (0 to skip)")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="results file from an earlier commit to compare p50s against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown vs baseline")
+    ap.add_argument("--min-ms", type=float, default=1.0, help="ignore stages faster than this in both runs")
+    args = ap.parse_args()
+
+    docs = {p.name: p.read_bytes() for p in sorted(DATA.glob("*.pdf"))}
+    st = Stages()
+    try:
+        t0 = time.perf_counter()
+        ingest(st, docs, args.ocr_pages)
+        ingest_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            query(st)
+        query_s = time.perf_counter() - t0
+    finally:
+        qdrant().close()
+        shutil.rmtree(_TMP, ignore_errors=True)
+
+    pages = st.items["extract"]
+    result = {
+        "meta": {"commit": git_commit(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cite_mode": CITE_MODE,
+                 "documents": len(docs), "pages": pages, "chunks": st.items["guess_corpus"],
+                 "queries": len(QUERIES) * args.repeat, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "ingest_pages_per_s": round(pages / ingest_s, 1),
+        "query_per_s": round(len(QUERIES) * args.repeat / query_s, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": st.report(),
+    }
+    for name, r in result["stages"].items():
+        print(json.dumps({"stage": name, **r}))
+    print(json.dumps({k: v for k, v in result.items() if k != "stages"}))
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+
+    if args.baseline:
+        slower = regressions(result["stages"], json.loads(Path(args.baseline).read_text()),
+                             args.tolerance, args.min_ms)
+        for r in slower:
+            print(json.dumps({"regression": r}))
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
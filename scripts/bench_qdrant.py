@@ -0,0 +1,75 @@
+# scripts/bench_qdrant.py
+# HTTP vs gRPC latency for search and bulk upsert against the configured Qdrant.
+# Run: python -m scripts.bench_qdrant [--points 20000] [--searches 500] [--dim 1536]
+import argparse, json, random, statistics, sys, time, uuid
+
+from qdrant_client.models import Distance, VectorParams, PointStruct
+from core.config import QDRANT_PATH
+from clients.qdrant_client import make_client
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def rand_vec(dim):
+    return [random.random() - 0.5 for _ in range(dim)]
+
+
+def bench(transport, points, searches, dim, batch):
+    client = make_client(prefer_grpc=(transport == "grpc"))
+    name = f"bench_{transport}_{uuid.uuid4().hex[:8]}"
+    client.create_collection(collection_name=name,
+                             vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    try:
+        vecs = [rand_vec(dim) for _ in range(min(points, 2000))]
+        upserts = []
+        t_all = time.perf_counter()
+        for i in range(0, points, batch):
+            pts = [PointStruct(id=j, vector=vecs[j % len(vecs)], payload={"corpus": "BNS"})
+                   for j in range(i, min(i + batch, points))]
+            t0 = time.perf_counter()
+            client.upsert(collection_name=name, points=pts, wait=True)
+            upserts.append((time.perf_counter() - t0) * 1000)
+        upsert_total = time.perf_counter() - t_all
+
+        lat = []
+        for _ in range(searches):
+            q = vecs[random.randrange(len(vecs))]
+            t0 = time.perf_counter()
+            client.search(collection_name=name, query_vector=q, limit=24, with_payload=True)
+            lat.append((time.perf_counter() - t0) * 1000)
+    finally:
+        client.delete_collection(collection_name=name)
+        client.close()
+
+    return {
+        "transport": transport,
+        "upsert_points_per_s": round(points / upsert_total, 1),
+        "upsert_batch_p50_ms": round(statistics.median(upserts), 2),
+        "upsert_batch_p95_ms": round(pct(upserts, 95), 2),
+        "search_p50_ms": round(statistics.median(lat), 2),
+        "search_p95_ms": round(pct(lat, 95), 2),
+        "search_qps": round(1000 / statistics.mean(lat), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=20000)
+    ap.add_argument("--searches", type=int, default=500)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--batch", type=int, default=256)
+    args = ap.parse_args()
+    if QDRANT_PATH:
+        # Local mode has no transport to compare, and one shared client that must stay open
+        sys.exit("bench_qdrant compares HTTP and gRPC against a Qdrant server, not local mode (QDRANT_PATH or BACKEND=embedded)")
+
+    random.seed(0)
+    for transport in ("http", "grpc"):
+        print(json.dumps(bench(transport, args.points, args.searches, args.dim, args.batch)))
+
+
+if __name__ == "__main__":
+    main()
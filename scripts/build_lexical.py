@@ -0,0 +1,28 @@
+# scripts/build_lexical.py
+# Backfill the BM25 index from the payloads already stored in the Qdrant collection.
+# Run: python -m scripts.build_lexical [--batch 1024]
+import argparse, time
+
+from clients.qdrant_client import qdrant, COLLECTION
+from retrieve.lexical import lexical
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", type=int, default=1024)
+    args = ap.parse_args()
+
+    client, index = qdrant(), lexical()
+    t0, seen, offset = time.perf_counter(), 0, None
+    while True:
+        points, offset = client.scroll(collection_name=COLLECTION, limit=args.batch, offset=offset,
+                                       with_payload=True, with_vectors=False)
+        index.add([{**p.payload, "chunk_id": str(p.id)} for p in points if p.payload.get("text")])
+        seen += len(points)
+        if offset is None:
+            break
+    print(f"{seen} points scanned, {index.count()} chunks indexed in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# scripts/build_sections.py
+# Rebuild the statute section index for every document already in the Qdrant collection.
+# Run: python -m scripts.build_sections [--doc NAME ...]
+import argparse, time
+
+from clients.qdrant_client import qdrant, COLLECTION
+from ingest.index import index_sections
+
+
+def all_docs(client) -> set[str]:
+    names, offset = set(), None
+    while True:
+        points, offset = client.scroll(collection_name=COLLECTION, limit=1024, offset=offset,
+                                       with_payload=["doc_name"], with_vectors=False)
+        names.update(p.payload["doc_name"] for p in points)
+        if offset is None:
+            return names
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--doc", nargs="*", help="only these documents (default: all)")
+    args = ap.parse_args()
+
+    client = qdrant()
+    for name in sorted(args.doc or all_docs(client)):
+        t0 = time.perf_counter()
+        n = index_sections(client, name)
+        print(f"{name}: {n} provisions in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# scripts/check_repair.py
+# Offline regression cases for the local JSON repair of model answers (no network, no index).
+# Run: python -m scripts.check_repair        # exits 1 if any case repairs differently
+import json, sys
+
+from answer.validate import repair_locally
+
+GOOD = {"query": "q", "answer": 'Section 125 says "wife" is entitled.',
+        "citations": [{"source": "CrPC.pdf", "page": 66, "snippet": "125. Order for maintenance"}]}
+RAW = json.dumps(GOOD)
+
+# name: (raw model output, expected answer, expected (source, page) citations)
+CASES = {
+    "clean": (RAW, GOOD["answer"], [("CrPC.pdf", 66)]),
+    "truncated_key": (RAW[:RAW.index('"citations"') + 5], GOOD["answer"], []),
+    "truncated_colon": (RAW[:RAW.index('"citations"') + 12], GOOD["answer"], []),
+    "trailing_comma": ('{"query":"q","answer":"a","citations":[],}', "a", []),
+    "fenced": ("Here you go:\n```json\n" + RAW + "\n```", GOOD["answer"], [("CrPC.pdf", 66)]),
+    # A quoted term followed by ", " inside the answer is text, not the end of the string
+    "quoted_terms": ('{"query":"q","answer":"terms "a", "b" here","citations":[]}', 'terms "a", "b" here', []),
+    "quoted_terms_snippet": ('{"query":"q","answer":"x","citations":[{"source":"a.pdf","page":1,'
+                             '"snippet":"say "hi", "there" ok"}]}', "x", [("a.pdf", 1)]),
+    "quoted_list": ('{"query":"q","answer":"The Act says "wife" includes "divorced woman", "and" more.",'
+                    '"citations":[]}', 'The Act says "wife" includes "divorced woman", "and" more.', []),
+}
+
+
+def main():
+    failed = 0
+    for name, (raw, answer, cites) in CASES.items():
+        data, _ = repair_locally(raw)
+        got = None if data is None else (data["answer"], [(c["source"], c["page"]) for c in data["citations"]])
+        ok = got == (answer, cites)
+        failed += not ok
+        print(json.dumps({"case": name, "ok": ok, **({} if ok else {"got": got})}))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
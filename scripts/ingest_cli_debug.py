@@ -3,7 +3,7 @@ from pathlib import Path
 from contextlib import ExitStack
 import requests
 
-URL_DEFAULT = "http://127.0.0.1:8000/ingest"
+URL_DEFAULT = "http://127.0.0.1:8000/ingest?wait=true"
 
 def find_files(root: Path, patterns=("*.pdf","*.docx","*.txt")):
     all_files = []
@@ -0,0 +1,82 @@
+# scripts/load_query.py
+# Concurrent /query load against a running server; compare throughput per worker across commits.
+# Run: python -m scripts.load_query [--url http://localhost:8000] [--concurrency 16] [--requests 200] [--stream]
+# --stream hits /query/stream and reports time to first byte separately from total time.
+import argparse, asyncio, json, statistics, time
+
+import httpx
+
+QUERIES = [
+    "What is the punishment for theft under BNS?",
+    "Section 103 BNS murder punishment",
+    "Article 21 right to life and personal liberty",
+    "Maintenance of wives, children and parents under BNSS",
+    "When can police arrest without a warrant?",
+    "Article 14 equality before law",
+]
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+async def run(url, concurrency, total, timeout, stream=False):
+    lat, ttfb, status = [], [], {}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(client, i):
+        async with sem:
+            t0 = time.perf_counter()
+            body = {"query": QUERIES[i % len(QUERIES)]}
+            try:
+                if stream:
+                    async with client.stream("POST", f"{url}/query/stream", json=body) as r:
+                        code = r.status_code
+                        first = None
+                        async for _ in r.aiter_bytes():
+                            first = first or time.perf_counter()
+                        if first:
+                            ttfb.append((first - t0) * 1000)
+                else:
+                    r = await client.post(f"{url}/query", json=body)
+                    code = r.status_code
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            lat.append((time.perf_counter() - t0) * 1000)
+            status[code] = status.get(code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(total)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(statistics.median(lat), 1),
+        "p95_ms": round(pct(lat, 95), 1),
+        **({"ttfb_p50_ms": round(statistics.median(ttfb), 1),
+            "ttfb_p95_ms": round(pct(ttfb, 95), 1)} if ttfb else {}),
+        "status": {str(k): v for k, v in status.items()},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--stream", action="store_true", help="use /query/stream and report TTFB")
+    args = ap.parse_args()
+
+    for c in args.concurrency:
+        print(json.dumps(asyncio.run(run(args.url, c, args.requests, args.timeout, args.stream))))
+
+
+if __name__ == "__main__":
+    main()
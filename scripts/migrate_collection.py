@@ -0,0 +1,20 @@
+# scripts/migrate_collection.py
+# Apply the configured HNSW / quantization / on-disk settings and payload indexes
+# to the existing collection. Settings come from the QDRANT_* environment variables.
+# Run: python -m scripts.migrate_collection [--dry-run]
+import argparse, json
+
+from clients.qdrant_client import qdrant, migrate_collection, COLLECTION
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dry-run", action="store_true", help="report the differences without applying them")
+    args = ap.parse_args()
+
+    changes = migrate_collection(qdrant(), dry_run=args.dry_run)
+    print(json.dumps({"collection": COLLECTION, "dry_run": args.dry_run, "changes": changes}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
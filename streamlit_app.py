@@ -16,6 +16,7 @@ import streamlit as st
 # =========================
 DEFAULT_BASE_URL = "http://127.0.0.1:8000"   # your backend base URL
 QUERY_PATH       = "/query"                  # POST endpoint (expects {"query": "..."} JSON)
+STREAM_PATH      = "/query/stream"           # same request, answered as server-sent events
 
 st.set_page_config(
     page_title="Legal MVP – RAG Demo",
@@ -139,6 +140,18 @@ def call_backend(base_url: str, query: str, timeout: int = 90) -> requests.Respo
     url = base_url.rstrip("/") + QUERY_PATH
     return requests.post(url, json={"query": query}, timeout=timeout)
 
+def stream_backend(base_url: str, query: str, timeout: int = 90):
+    """Yield (event, data) pairs from the SSE endpoint as they arrive."""
+    url = base_url.rstrip("/") + STREAM_PATH
+    with requests.post(url, json={"query": query}, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        event = "message"
+        for line in resp.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[5:])
+
 def ensure_session():
     if "history" not in st.session_state:
         st.session_state.history: List[Dict[str, Any]] = []
@@ -150,6 +163,7 @@ with st.sidebar:
     st.header("⚙️ Settings")
     base_url = st.text_input("Backend URL", value=DEFAULT_BASE_URL, help="Your FastAPI server")
     answer_style = st.radio("Answer style", ["Detailed", "Summary"], horizontal=True)
+    stream_answers = st.toggle("Stream answer", value=True, help="Show sources and answer text as they arrive")
     show_raw = st.toggle("Show raw JSON", value=False)
     gen_html = st.toggle("Also fetch HTML report", value=False, help="Uses ?format=html (if supported)")
     st.divider()
@@ -197,42 +211,72 @@ if submit:
     else:
         query_to_send = build_query(user_query, answer_style)
         t0 = time.perf_counter()
-        with st.spinner("Thinking… contacting backend and composing a grounded answer."):
+        if stream_answers:
+            live = st.empty()
+            text, data, ttfb_ms = "", None, None
             try:
-                resp = call_backend(base_url, query_to_send)
+                for event, payload in stream_backend(base_url, query_to_send):
+                    if ttfb_ms is None:
+                        ttfb_ms = int((time.perf_counter() - t0) * 1000)
+                    if event == "sources":
+                        names = ", ".join(f"{s['source']} p.{s['page']}" for s in payload["sources"])
+                        live.caption(f"Sources: {names}")
+                    elif event == "token":
+                        text += payload["text"]
+                        live.markdown(superscript_markers(text) + " ▌", unsafe_allow_html=True)
+                    elif event == "answer":
+                        data = payload
+                    elif event == "error":
+                        st.error("Backend error")
+                        st.code(json.dumps(payload, indent=2, ensure_ascii=False), language="json")
             except requests.exceptions.RequestException as e:
                 st.error(f"Request error: {e}")
-                resp = None
-
-        latency_ms = int((time.perf_counter() - t0) * 1000)
-
-        if resp is None:
-            pass
-        elif resp.status_code != 200:
-            # Try to surface backend error nicely
-            try:
-                err_json = resp.json()
-                st.error(f"Backend error {resp.status_code}")
-                st.code(json.dumps(err_json, indent=2, ensure_ascii=False), language="json")
-            except Exception:
-                st.error(f"Backend error {resp.status_code}: {resp.text}")
-        else:
-            # Parse JSON answer
-            try:
-                data = resp.json()
-            except Exception:
-                st.error("Backend did not return JSON.")
-                st.text(resp.text)
-                data = None
-
+            live.empty()
             if data:
-                # Save to history
                 st.session_state.history.insert(0, {
                     "query": user_query.strip(),
                     "style": answer_style,
                     "data": data,
-                    "latency_ms": latency_ms
+                    "latency_ms": int((time.perf_counter() - t0) * 1000),
+                    "ttfb_ms": ttfb_ms,
                 })
+        else:
+            with st.spinner("Thinking… contacting backend and composing a grounded answer."):
+                try:
+                    resp = call_backend(base_url, query_to_send)
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Request error: {e}")
+                    resp = None
+
+            latency_ms = int((time.perf_counter() - t0) * 1000)
+
+            if resp is None:
+                pass
+            elif resp.status_code != 200:
+                # Try to surface backend error nicely
+                try:
+                    err_json = resp.json()
+                    st.error(f"Backend error {resp.status_code}")
+                    st.code(json.dumps(err_json, indent=2, ensure_ascii=False), language="json")
+                except Exception:
+                    st.error(f"Backend error {resp.status_code}: {resp.text}")
+            else:
+                # Parse JSON answer
+                try:
+                    data = resp.json()
+                except Exception:
+                    st.error("Backend did not return JSON.")
+                    st.text(resp.text)
+                    data = None
+
+                if data:
+                    # Save to history
+                    st.session_state.history.insert(0, {
+                        "query": user_query.strip(),
+                        "style": answer_style,
+                        "data": data,
+                        "latency_ms": latency_ms
+                    })
 
 # =========================
 # Render Latest Answer (as a card)
@@ -253,7 +297,9 @@ if st.session_state.history:
 
     # Small meta row
     st.markdown(
-        f'<div class="small-meta">Style: <b>{latest["style"]}</b> • Latency: <b>{latency_ms} ms</b></div>',
+        f'<div class="small-meta">Style: <b>{latest["style"]}</b> • Latency: <b>{latency_ms} ms</b>'
+        + (f' • First byte: <b>{latest["ttfb_ms"]} ms</b>' if latest.get("ttfb_ms") is not None else "")
+        + '</div>',
         unsafe_allow_html=True,
     )
     st.markdown("</div>", unsafe_allow_html=True)